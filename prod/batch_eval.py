@@ -0,0 +1,159 @@
+import random
+import time
+
+import chess
+import numpy as np
+
+from prod.incremental_eval import material_and_pst, max_phase
+from prod.pawn_structure import (advanced_bonus, doubled_penalty, evaluate_pawn_structure, isolated_penalty,
+                                 passed_bonus, supported_bonus)
+from prod.zobrist import piece_index
+
+FILE_A = np.uint64(chess.BB_FILE_A)
+FILE_H = np.uint64(chess.BB_FILE_H)
+FILES = np.array(chess.BB_FILES, dtype=np.uint64)
+ADJACENT_FILES = np.array([(chess.BB_FILES[f - 1] if f > 0 else 0) | (chess.BB_FILES[f + 1] if f < 7 else 0)
+                           for f in range(8)], dtype=np.uint64)
+# Rows evaluated at once; bounds the per-chunk N x 768 bit matrix to 12 MB
+batch_chunk_rows = 16384
+
+
+def pack_boards(boards):
+    """N x 12 uint64 bitboards, one column per piece_index (white pawn..king, then black)."""
+    packed = np.zeros((len(boards), 12), dtype=np.uint64)
+    for row, board in enumerate(boards):
+        for color in chess.COLORS:
+            for piece_type in chess.PIECE_TYPES:
+                packed[row, piece_index(piece_type, color)] = board.pieces_mask(piece_type, color)
+    return packed
+
+
+def popcount(bb):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(bb).astype(np.int64)
+    bits = np.unpackbits(bb[..., np.newaxis].view(np.uint8), axis=-1)
+    return bits.sum(axis=-1, dtype=np.int64)
+
+
+def _shift(bb, n):
+    return bb << np.uint64(n) if n > 0 else bb >> np.uint64(-n)
+
+
+def _east(bb):
+    return _shift(bb, 1) & ~FILE_A
+
+
+def _west(bb):
+    return _shift(bb, -1) & ~FILE_H
+
+
+def _fill(bb, step):
+    """Squares strictly beyond each set bit, repeatedly shifting by *step* (8 north, -8 south)."""
+    filled = np.zeros_like(bb)
+    for _ in range(7):
+        bb = _shift(bb, step)
+        filled |= bb
+    return filled
+
+
+def material_and_pst_batch(packed, tables):
+    """Tapered material + PST score for every row of *packed*, like material_and_pst.
+
+    The bits stay uint8 and only the set ones are looked up in the tables, so
+    the work and the extra memory follow the piece count rather than all 768
+    piece-squares of every row.
+    """
+    rows = len(packed)
+    bits = np.unpackbits(packed.view(np.uint8).reshape(rows, 12, 8), axis=2, bitorder='little')
+    row, piece_square = np.nonzero(bits.reshape(rows, 12 * 64))
+    # Float sums of small integers are exact
+    mg = np.bincount(row, np.array(tables.mg, dtype=np.int64)[piece_square], minlength=rows).astype(np.int64)
+    eg = np.bincount(row, np.array(tables.eg, dtype=np.int64)[piece_square], minlength=rows).astype(np.int64)
+    phase = np.minimum(popcount(packed) @ np.array(tables.phase, dtype=np.int64), max_phase)
+    return (mg * phase + eg * (max_phase - phase)) // max_phase
+
+
+def _pawn_side_score(own, enemy, color):
+    """Pawn terms of pawn_structure.pawn_structure_score for one side, per row."""
+    score = np.zeros(len(own), dtype=np.int64)
+    for f in range(8):
+        on_file = popcount(own & FILES[f])
+        score -= np.where(on_file > 1, on_file, 0) * doubled_penalty
+        score -= np.where((own & ADJACENT_FILES[f]) == 0, on_file, 0) * isolated_penalty
+
+    forward = 8 if color == chess.WHITE else -8
+    defended = _east(_shift(own, forward)) | _west(_shift(own, forward))
+    supported = own & (defended | _east(own) | _west(own))
+    score += popcount(supported) * supported_bonus
+
+    # Squares an enemy pawn guards against a passer: its own and adjacent files, behind it
+    front = enemy | _east(enemy) | _west(enemy)
+    blocked = _fill(front, -forward)
+    score += popcount(own & ~blocked) * passed_bonus
+
+    score += popcount(own & np.uint64(chess.BB_RANK_7 if color == chess.WHITE else chess.BB_RANK_2)) * advanced_bonus
+    return score
+
+
+def pawn_structure_batch(packed):
+    """pawn_structure.pawn_structure_score for every row of *packed*."""
+    white = packed[:, piece_index(chess.PAWN, chess.WHITE)]
+    black = packed[:, piece_index(chess.PAWN, chess.BLACK)]
+    return _pawn_side_score(white, black, chess.WHITE) - _pawn_side_score(black, white, chess.BLACK)
+
+
+def evaluate_batch(packed, tables, chunk_rows=batch_chunk_rows):
+    """Material, PST and pawn-structure terms of engine_third.evaluate_board for N x 12 bitboards.
+
+    Rows are evaluated chunk_rows at a time, so memory stays bounded however
+    many positions are passed. Mobility, king safety, the promotion bonus and
+    mate/stalemate detection need move generation and are left to the scalar
+    evaluator.
+    """
+    packed = np.ascontiguousarray(packed, dtype='<u8')  # Little-endian, so the byte view unpacks a1 first
+    scores = np.empty(len(packed), dtype=np.int64)
+    for start in range(0, len(packed), chunk_rows):
+        chunk = packed[start:start + chunk_rows]
+        scores[start:start + len(chunk)] = material_and_pst_batch(chunk, tables) + pawn_structure_batch(chunk)
+    return scores
+
+
+def check_parity(positions=2000, seed=0, chunk_rows=997):
+    """Compare evaluate_batch against the scalar terms on random positions; returns the mismatch count.
+
+    The batch is also evaluated in chunks of chunk_rows, which should not
+    divide positions, so rows on either side of a chunk boundary are covered.
+    """
+    from prod import engine_third
+
+    rng = random.Random(seed)
+    boards = []
+    board = chess.Board()
+    while len(boards) < positions:
+        moves = list(board.legal_moves)
+        if not moves or board.ply() > 150:
+            board = chess.Board()
+            continue
+        board.push(rng.choice(moves))
+        boards.append(board.copy(stack=False))
+
+    packed = pack_boards(boards)
+    start = time.time()
+    batch = evaluate_batch(packed, engine_third.eval_tables)
+    batch_time = time.time() - start
+    chunked = evaluate_batch(packed, engine_third.eval_tables, chunk_rows)
+    start = time.time()
+    scalar = [material_and_pst(b, engine_third.eval_tables) + evaluate_pawn_structure(b) for b in boards]
+    scalar_time = time.time() - start
+
+    mismatches = [(b.fen(), int(x), int(c), y) for b, x, c, y in zip(boards, batch, chunked, scalar)
+                  if x != y or c != y]
+    for fen, got, got_chunked, expected in mismatches[:10]:
+        print(f"Mismatch {fen}: batch {got}, chunked {got_chunked}, scalar {expected}")
+    print(f"{positions} positions, {len(mismatches)} mismatches, chunks of {chunk_rows} "
+          f"(batch {batch_time:.3f}s, scalar {scalar_time:.3f}s)")
+    return len(mismatches)
+
+
+if __name__ == "__main__":
+    check_parity()
@@ -0,0 +1,157 @@
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import sys
+import time
+
+import chess
+
+from prod import profiling
+
+# Registered engines, by module name
+bench_engines = ("prod.engine", "prod.engine_second", "prod.engine_third")
+
+# Openings, middlegames, tactical positions and endgames
+bench_positions = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 10",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 11",
+    "4rrk1/pp1n3p/3q2pQ/2p1pb2/2PP4/2P3N1/P2B2PP/4RRK1 b - - 7 19",
+    "rq3rk1/ppp2ppp/1bnpb3/3N2B1/3NP3/7P/PPPQ1PP1/2KR3R w - - 7 14",
+    "r1bq1r1k/1pp1n1pp/1p1p4/4p2Q/4Pp2/1BNP4/PPP2PPP/3R1RK1 w - - 2 14",
+    "r3r1k1/2p2ppp/p1p1bn2/8/1q2P3/2NPQN2/PPP3PP/R4RK1 b - - 2 15",
+    "r1bbk1nr/pp3p1p/2n5/1N4p1/2Np1B2/8/PPP2PPP/2KR1B1R w kq - 0 13",
+    "r1bq1rk1/ppp1nppp/4n3/3p3Q/3P4/1BP1B3/PP1N2PP/R4RK1 w - - 1 16",
+    "4r1k1/r1q2ppp/ppp2n2/4P3/5Rb1/1N1BQ3/PPP3PP/R5K1 w - - 1 17",
+    "2rqkb1r/ppp2p2/2npb1p1/1N1Nn2p/2P1PP2/8/PP2B1PP/R1BQK2R b KQ - 0 11",
+    "r1bq1r1k/b1p1npp1/p2p3p/1p6/3PP3/1B2NN2/PP3PPP/R2Q1RK1 w - - 1 16",
+    "3r1rk1/p5pp/bpp1pp2/8/q1PP1P2/b3P3/P2NQRPP/1R2B1K1 b - - 6 22",
+    "r1q2rk1/2p1bppp/2Pp4/p6b/Q1PNp3/4B3/PP1R1PPP/2K4R w - - 2 18",
+    "4k2r/1pb2ppp/1p2p3/1R1p4/3P4/2r1PN2/P4PPP/1R4K1 b - - 3 22",
+    "3q2k1/pb3p1p/4pbp1/2r5/PpN2N2/1P2P2P/5PP1/Q2R2K1 b - - 4 26",
+    "6k1/6p1/6Pp/ppp5/3pn2P/1P3K2/1PP2P2/8 b - - 3 54",
+    "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "6k1/3b3r/1p1p4/p1n2p2/1PPNpP1q/P3Q1p1/1R1RB1P1/5K2 b - - 0 1",
+    "r2r1n2/pp2bk2/2p1p2p/3q4/3PN1QP/2P3R1/P4PP1/5RK1 w - - 0 1",
+    "8/8/8/8/5kp1/P7/8/1K1N4 w - - 0 1",
+    "8/8/8/5N2/8/p7/8/2NK3k w - - 0 1",
+    "8/8/1P6/5pr1/8/4R3/7k/2K5 w - - 0 1",
+    "8/2p4P/8/kr6/6R1/8/8/1K6 w - - 0 1",
+    "8/8/3P3k/8/1p6/8/1P6/1K3n2 b - - 0 1",
+    "8/R7/2q5/8/6k1/8/1P5p/K6R w - - 0 124",
+    "r1bqk2r/2p1bppp/p1np1n2/1p2p3/4P3/1B3N2/PPPP1PPP/RNBQR1K1 w kq - 0 8",
+    "rn1qkb1r/1p3ppp/p2pbn2/4p3/4P3/1NN1B3/PPP2PPP/R2QKB1R w KQkq - 2 8",
+    "rnbq1rk1/p1p1bpp1/1p2pn1p/3p4/2PP3B/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 8",
+    "r1bq1rk1/ppp2pbp/2np1np1/4p3/2PPP3/2N2N2/PP2BPPP/R1BQ1RK1 w - - 2 8",
+    "rnbq1rk1/pp2nppp/4p3/2ppP3/3P2Q1/P1P5/2P2PPP/R1B1KBNR w KQ - 3 8",
+    "r2qkbnr/pp1nppp1/2p3bp/8/3P3P/5NN1/PPP2PP1/R1BQKB1R w KQkq - 2 8",
+    "r1bqk2r/ppp1bppp/1nn5/4p3/8/2N2NP1/PP1PPPBP/R1BQ1RK1 w kq - 4 8",
+    "r1bq1rk1/pp3ppp/2nbpn2/2pp4/3P4/2P1PNB1/PP1N1PPP/R2QKB1R w KQ - 4 8",
+    "r1bq1rk1/1pp2ppp/p1np1n2/2b1p3/2B1P3/2PP1N2/PP3PPP/RNBQR1K1 w - - 0 8",
+    "rn2kb1r/pp3ppp/2p1pn2/q4b2/2BP4/2N2N2/PPPB1PPP/R2QK2R w KQkq - 0 8",
+    "rn1q1rk1/pbp2pp1/1p2pn1p/3p4/2PP3B/P1Q2P2/1P2P1PP/R3KBNR w KQ - 0 10",
+    "r2q1rk1/pp1bppbp/2np1np1/8/2PNP3/2N1B3/PP2BPPP/R2Q1RK1 w - - 2 10",
+    "r2q1rk1/pp1n1ppp/2p1pn2/5b2/PbBP4/2N1PN2/1P2QPPP/R1B2RK1 w - - 5 10",
+    "r1bqk2r/ppp1bppp/8/3p4/1nPPn3/3B1N2/PP3PPP/RNBQ1RK1 w kq - 1 9",
+    "r1bq1rk1/p3bppp/2n1pn2/1ppp4/4P3/3P1NP1/PPPN1PBP/R1BQR1K1 w - - 0 9",
+    "8/8/8/4k3/8/8/4P3/4K3 w - - 0 1",
+    "8/8/8/8/8/5k2/8/4K2R w K - 0 1",
+    "1K1k4/1P6/8/8/8/8/r7/2R5 w - - 0 1",
+    "8/8/8/8/4k3/8/r7/4K2R b K - 0 1",
+    "8/5k2/8/8/8/8/3Q4/4K3 w - - 0 1",
+    "8/8/4kpp1/3p4/p6P/2B4b/6P1/6K1 b - - 1 48",
+    "2r3k1/5pp1/4p2p/8/3R4/5P2/5KPP/8 w - - 0 30",
+    "8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1",
+    "8/pp3kpp/8/8/8/8/PP3KPP/8 w - - 0 1",
+    "4k3/8/8/8/8/8/PPPPPPPP/4K3 w - - 0 1",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+    "8/8/p1p5/1p5p/1P5p/8/PPP2K1k/4R3 w - - 0 1"
+]
+
+
+def _search(engine, fen, max_time, max_depth):
+    """One quiet, single-process search from a fresh engine state; returns its result record."""
+    engine.new_game()
+    board = chess.Board(fen)
+    start = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        search = profiling.profiled(engine.get_best_move_with_time_limitation, engine.__name__)
+        move = search(board, max_time=max_time, max_depth=max_depth, root_workers=1)
+    elapsed = time.time() - start
+    context = engine.search_context
+    return {"fen": fen, "best_move": move.uci() if move else None,
+            "nodes": context.nodes + context.qnodes, "depth": context.completed_depth,
+            "time": round(elapsed, 4)}
+
+
+def _summary(results):
+    nodes = sum(result["nodes"] for result in results)
+    elapsed = sum(result["time"] for result in results)
+    return {"nodes": nodes, "time": round(elapsed, 3), "nps": round(nodes / elapsed) if elapsed else 0}
+
+
+def bench_engine(engine_name, depth, movetime, positions):
+    """Fixed-depth and fixed-time runs of one engine over *positions*."""
+    engine = importlib.import_module(engine_name)
+    fixed_depth = [_search(engine, fen, 10 ** 6, depth) for fen in positions]
+    fixed_time = [_search(engine, fen, movetime, 100) for fen in positions]
+    return {
+        "fixed_depth": dict(_summary(fixed_depth), depth=depth,
+                            # Node total at a fixed depth is deterministic: it changes only when the search does
+                            signature=sum(result["nodes"] for result in fixed_depth),
+                            time_to_depth=[result["time"] for result in fixed_depth],
+                            positions=fixed_depth),
+        "fixed_time": dict(_summary(fixed_time), movetime=movetime,
+                           average_depth=round(sum(result["depth"] for result in fixed_time) / len(fixed_time), 2),
+                           positions=fixed_time),
+    }
+
+
+def run_bench(engines=bench_engines, depth=3, movetime=0.5, positions=None):
+    """Bench every engine and return the report as a dict."""
+    positions = positions or bench_positions
+    report = {"depth": depth, "movetime": movetime, "positions": len(positions), "engines": {}}
+    for engine_name in engines:
+        report["engines"][engine_name] = bench_engine(engine_name, depth, movetime, positions)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixed-depth and fixed-time search benchmark for the engines.")
+    parser.add_argument("--engines", default=",".join(bench_engines), help="comma-separated engine modules")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--movetime", type=float, default=0.5, help="seconds per position in the fixed-time run")
+    parser.add_argument("--positions", type=int, default=len(bench_positions), help="use the first N positions")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--full", action="store_true", help="include per-position results")
+    parser.add_argument("--profile", metavar="DIR", help="profile every search into DIR (times are inflated)")
+    args = parser.parse_args()
+    if args.profile:
+        profiling.enable(args.profile)
+
+    report = run_bench(args.engines.split(","), args.depth, args.movetime, bench_positions[:args.positions])
+    if not args.full:
+        for result in report["engines"].values():
+            for mode in result.values():
+                del mode["positions"]
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    for engine_name, result in report["engines"].items():
+        fixed_depth = result["fixed_depth"]
+        print(f"{engine_name}: signature {fixed_depth['signature']}, {fixed_depth['nps']} nps at depth {args.depth}",
+              file=sys.stderr)
+    if args.profile:
+        with contextlib.redirect_stdout(sys.stderr):
+            profiling.summarize(args.profile)
+
+
+if __name__ == "__main__":
+    main()
@@ -41,4 +41,25 @@ unicode_pieces = {
 }
 
 move_time_for_engine = 2
-max_depth_for_engine = 6
\ No newline at end of file
+max_depth_for_engine = 6
+transposition_table_size_mb = 64
+eval_cache_size_mb = 8
+pawn_hash_size_mb = 1
+# Processes per engine_third search (1 = no Lazy-SMP helpers)
+search_workers = 1
+# Processes for root-split search (1 = search the root serially)
+root_split_workers = 1
+# Fraction of the move time after which no new iteration is started
+soft_time_fraction = 0.5
+# Think on the human's time in human_vs_computer
+ponder_on_human_turn = True
+# Longest a ponder search may run while waiting for the human
+ponder_time_limit = 600
+# Directory for per-move cProfile dumps of every search (None = off); see prod/profiling.py
+profile_dir = None
+# Functions listed in each profile summary
+profile_top_functions = 15
+# Polyglot .bin opening book played from before searching (None = no book); see prod/opening_book.py
+opening_book_path = None
+# "weighted" picks book moves in proportion to their weights, "best" always plays the top one
+opening_book_selection = "weighted"
@@ -1,10 +1,21 @@
 import chess
+import functools
 import random
 import time
-import threading
-from queue import Queue
 
-from prod.constants import move_time_for_engine, max_depth_for_engine
+from prod.constants import (move_time_for_engine, max_depth_for_engine, root_split_workers, soft_time_fraction,
+                            eval_cache_size_mb)
+from prod.engine_service import EngineService
+from prod.eval_cache import EvalCache
+from prod.fast_board import SearchBoard
+from prod.incremental_eval import EvalSearchBoard, build_eval_tables, material_and_pst
+from prod.move_picker import staged_moves_int
+from prod.quiescence import quiescence_int
+from prod.root_split import root_split_search
+from prod.search import INF, MATE, aspiration_search, search_root
+from prod.search_context import SearchContext
+from prod.search_stats import SearchStats
+from prod.see import check_squares, gives_direct_check, see
 
 # Piece-square tables for better positional evaluation (simplified)
 piece_square_tables = {
@@ -70,10 +81,16 @@ piece_square_tables = {
     ]
 }
 
+piece_values = {chess.PAWN: 100, chess.KNIGHT: 320, chess.BISHOP: 330,
+                chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 100000}
+
+# Material, PST and undeveloped-piece penalty folded into incremental tables
+eval_tables = build_eval_tables(piece_values, piece_square_tables,
+                                back_rank_penalty={chess.KNIGHT: 50, chess.BISHOP: 50, chess.ROOK: 50,
+                                                   chess.QUEEN: 50, chess.KING: 50})
+
 def piece_value(piece):
-    values = {chess.PAWN: 100, chess.KNIGHT: 320, chess.BISHOP: 330,
-              chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 100000}
-    return values.get(piece.piece_type, 0)
+    return piece_values.get(piece.piece_type, 0)
 
 def evaluate_board(board):
     if board.is_checkmate():
@@ -81,75 +98,95 @@ def evaluate_board(board):
     if board.is_stalemate() or board.is_insufficient_material():
         return 0
 
-    score = 0
-    undeveloped_penalty = 0
-
-    for square, piece in board.piece_map().items():
-        value = piece_value(piece)
-        rank = chess.square_rank(square)
-
-        if piece.color == chess.WHITE:
-            score += value
-            if piece.piece_type in piece_square_tables:
-                score += piece_square_tables[piece.piece_type][square]
-            if piece.piece_type != chess.PAWN and rank == 0:
-                undeveloped_penalty -= 50
-        else:
-            score -= value
-            if piece.piece_type in piece_square_tables:
-                score -= piece_square_tables[piece.piece_type][63 - square]
-            if piece.piece_type != chess.PAWN and rank == 7:
-                undeveloped_penalty += 50
-
-    score += undeveloped_penalty
-    return score
+    return material_and_pst(board, eval_tables)
 
 def order_moves(board, moves):
     """Order moves to maximize alpha-beta pruning efficiency."""
+    checks = check_squares(board)
+
     def move_priority(move):
         if board.is_capture(move):
-            victim = board.piece_at(move.to_square)
-            attacker = board.piece_at(move.from_square)
-            victim_value = piece_value(victim) if victim else 0
-            attacker_value = piece_value(attacker) if attacker else 0
-            return victim_value - attacker_value
-        board.push(move)
-        is_check = board.is_check()
-        board.pop()
-        return 1000 if is_check else 0
+            return see(board, move)
+        return 1000 if gives_direct_check(board, move, checks) else 0
 
     return sorted(moves, key=move_priority, reverse=True)
 
-def minimax(board, depth, alpha, beta, maximizing_player):
-    if depth == 0 or board.is_game_over():
-        return evaluate_board(board)
-
-    legal_moves = order_moves(board, list(board.legal_moves))
-
-    if maximizing_player:
-        max_eval = float('-inf')
-        for move in legal_moves:
-            board.push(move)
-            eval = minimax(board, depth - 1, alpha, beta, False)
-            board.pop()
-            max_eval = max(max_eval, eval)
-            alpha = max(alpha, eval)
-            if beta <= alpha:
-                break
-        return max_eval
-    else:
-        min_eval = float('inf')
-        for move in legal_moves:
-            board.push(move)
-            eval = minimax(board, depth - 1, alpha, beta, True)
-            board.pop()
-            min_eval = min(min_eval, eval)
-            beta = min(beta, eval)
-            if beta <= alpha:
-                break
-        return min_eval
-
-def get_best_move_with_time_limitation(board, max_time=move_time_for_engine, max_depth=max_depth_for_engine, result_queue=None):
+# Node counters for the running search, reset at the root
+search_context = SearchContext()
+
+# Static evaluations from White's point of view, shared across iterations
+eval_cache = EvalCache(eval_cache_size_mb)
+
+def new_game():
+    """Forget everything kept between searches, so the next search starts from scratch."""
+    search_context.clear()
+    eval_cache.clear()
+
+def set_hash_size(size_mb):
+    """Replace the eval cache, this engine's only hash table, with an empty one of size_mb."""
+    global eval_cache
+    eval_cache = EvalCache(size_mb)
+
+def root_board(board):
+    """The board negamax searches, built from a chess.Board at the root: an EvalSearchBoard with int moves."""
+    return EvalSearchBoard.from_board(board, eval_tables=eval_tables)
+
+def evaluate_relative(board):
+    """Material and PST of a SearchBoard from the side to move's point of view, as negamax expects, through eval_cache.
+
+    Checkmate and stalemate are scored by the search itself, which sees the legal moves.
+    """
+    key = board.zobrist_key
+    score = eval_cache.probe(key)
+    if score is None:
+        score = 0 if board.is_insufficient_material() else material_and_pst(board, eval_tables)
+        eval_cache.store(key, score)
+    return score if board.turn == chess.WHITE else -score
+
+def negamax(board, depth, alpha, beta):
+    """Principal variation search on a root_board(); non-PV moves get a zero-window search first."""
+    ply = len(board.undo) - search_context.root_ply
+    if ply > search_context.seldepth:
+        search_context.seldepth = ply
+    if depth <= 0:
+        return quiescence_int(board, alpha, beta, evaluate_relative, search_context)
+    search_context.nodes += 1
+    search_context.poll()
+
+    best_value = -INF
+    for i, move in enumerate(staged_moves_int(board)):
+        board.make(move)
+        if i == 0:
+            value = -negamax(board, depth - 1, -beta, -alpha)
+        else:
+            value = -negamax(board, depth - 1, -alpha - 1, -alpha)
+            if alpha < value < beta:
+                value = -negamax(board, depth - 1, -beta, -alpha)
+        board.unmake()
+        if value > best_value:
+            best_value = value
+            if value > alpha:
+                alpha = value
+        if alpha >= beta:
+            search_context.count_cutoff(i)
+            break
+    if best_value == -INF:
+        # No legal moves
+        return -(MATE - ply) if board.is_check() else 0
+    return best_value
+
+def get_best_move_with_time_limitation(board, max_time=move_time_for_engine, max_depth=max_depth_for_engine, result_queue=None,
+                                       root_workers=root_split_workers, stop_event=None, stats=None,
+                                       max_nodes=None):
+    """Iterative deepening until max_depth, the time limits, max_nodes or stop_event.
+
+    No new iteration starts after soft_time_fraction of max_time; the tree is
+    abandoned mid-iteration at max_time, after max_nodes nodes or when
+    stop_event is set, and the best move of the last completed iteration is
+    returned. Every completed iteration is recorded in stats, a SearchStats
+    that can stream them. The tree is searched on root_board(board) with int
+    moves, converted back to chess.Move on the way out.
+    """
     print(f'Calculating best move (max time: {max_time}s)...')
     if not board.legal_moves:
         if result_queue:
@@ -159,59 +196,68 @@ def get_best_move_with_time_limitation(board, max_time=move_time_for_engine, max
     start_time = time.time()
     last_check = start_time
     best_move = None
-    legal_moves = order_moves(board, list(board.legal_moves))
+    best_value = None
+    legal_moves = [SearchBoard.move_from_chess(move) for move in order_moves(board, list(board.legal_moves))]
+    to_chess = SearchBoard.move_to_chess
+    board = root_board(board)
+    search_context.new_search(board)
+    eval_cache.reset_stats()
+    deadline = start_time + max_time
+    search_context.set_limits(deadline, stop_event, max_nodes)
+    if stats is None:
+        stats = SearchStats()
+
+    root_search = search_root
+    if root_workers > 1:
+        # Split the root moves after the PV move across a persistent process pool
+        root_search = functools.partial(root_split_search, __name__, workers=root_workers, context=search_context)
 
-    is_maximizing = board.turn == chess.WHITE
     for depth in range(1, max_depth + 1):
         current_time = time.time()
         if current_time - last_check >= 10:
             print(f"\rElapsed time: {current_time - start_time:.2f} seconds")
             last_check = current_time
+        if depth > 1 and current_time - start_time >= max_time * soft_time_fraction:
+            print(f"Soft time limit reached after depth {depth - 1}.")
+            break
+        if depth > 1 and stop_event is not None and stop_event.is_set():
+            print(f"Stopped after depth {depth - 1}.")
+            break
+
+        value, current_best_move, completed = aspiration_search(
+            board, legal_moves, depth, best_value, negamax, deadline, root_search, stop_event)
+        if not completed:
+            print(f"Time limit reached at depth {depth - 1}. Best move so far returned.")
+            move = to_chess(best_move or current_best_move or legal_moves[0])
+            if result_queue:
+                result_queue.put(move)
+            return move
 
-        current_best_move = None
-        best_value = float('-inf') if is_maximizing else float('inf')
-        alpha = float('-inf')
-        beta = float('inf')
-
-        for move in legal_moves:
-            board.push(move)
-            value = minimax(board, depth - 1, alpha, beta, not is_maximizing)
-            board.pop()
-
-            if is_maximizing:
-                if value > best_value:
-                    best_value = value
-                    current_best_move = move
-                alpha = max(alpha, value)
-            else:
-                if value < best_value:
-                    best_value = value
-                    current_best_move = move
-                beta = min(beta, value)
-
-            elapsed_time = time.time() - start_time
-            if elapsed_time >= max_time:
-                print(f"Time limit reached at depth {depth - 1}. Best move so far returned.")
-                if result_queue:
-                    result_queue.put(best_move if best_move else current_best_move)
-                return best_move if best_move else current_best_move
-
-        best_move = current_best_move
-        print(f"Completed depth {depth} in {time.time() - start_time:.2f}s")
+        best_move, best_value = current_best_move, value
+        search_context.completed_depth = depth
+        # Search the previous best move first so the next iteration has a PV to follow
+        legal_moves.remove(best_move)
+        legal_moves.insert(0, best_move)
+        iteration = stats.record(search_context, depth, value, [to_chess(best_move)], time.time() - start_time)
+        print(f"Completed {iteration}, eval cache hits {eval_cache.hit_rate():.0%}")
 
+    best_move = to_chess(best_move) if best_move else None
     if result_queue:
         result_queue.put(best_move)
     return best_move
 
-def get_best_move_async(board, max_time=move_time_for_engine, max_depth=max_depth_for_engine):
-    """Run move calculation in a separate thread and return the result via a queue."""
-    result_queue = Queue()
-    thread = threading.Thread(
-        target=get_best_move_with_time_limitation,
-        args=(board.copy(), max_time, max_depth, result_queue)
-    )
-    thread.start()
-    return result_queue
+# Worker thread that runs this engine's searches and keeps its state warm
+engine_service = EngineService(get_best_move_with_time_limitation, name=__name__)
+
+def get_best_move_async(board, max_time=move_time_for_engine, max_depth=max_depth_for_engine, callback=None,
+                       on_iteration=None):
+    """Queue the search on the engine's worker thread and return its SearchHandle.
+
+    handle.cancel() makes the search return its best move right away; handle.stats
+    collects the per-iteration statistics, also passed to on_iteration as they complete.
+    """
+    return engine_service.submit(board, {'max_time': max_time, 'max_depth': max_depth}, callback,
+                                 on_iteration)
 
 def get_random_engine_move(board):
     print('Random move!')
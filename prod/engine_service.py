@@ -0,0 +1,108 @@
+import threading
+from queue import Queue
+
+from prod import opening_book
+from prod.profiling import profiled
+from prod.search_stats import SearchStats
+
+
+class SearchHandle:
+    """A submitted search: wait() for its move, cancel() it, or check done().
+
+    stats holds the SearchStats of the search, filled in as iterations complete.
+    """
+
+    def __init__(self, board, limits, callback=None, on_iteration=None):
+        self.board = board.copy()
+        self.limits = limits
+        self.callback = callback
+        self.stop_event = threading.Event()
+        self.stats = SearchStats(on_iteration)
+        self.result = None
+        self._done = threading.Event()
+
+    def cancel(self):
+        """Stop the search; it still reports its best move so far.
+
+        A search cancelled before it starts still runs, but returns before
+        its first root move and reports the engine's first ordered root move.
+        """
+        self.stop_event.set()
+
+    def cancelled(self):
+        return self.stop_event.is_set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the search finishes (or timeout passes) and return its move, or None."""
+        self._done.wait(timeout)
+        return self.result
+
+    def _finish(self, result):
+        self.result = result
+        self._done.set()
+        if self.callback:
+            self.callback(self)
+
+
+class EngineService:
+    """Long-lived worker thread that runs one engine's searches one at a time.
+
+    search(board, stop_event=..., stats=..., **limits) is the engine's blocking search.
+    Jobs run in submission order on the same thread, so the engine's module
+    state (transposition table, history, process pools) stays warm between
+    moves and two searches never share it at once. The thread is started on
+    the first submit, so importing an engine in a worker process costs nothing.
+    The search is wrapped by profiling.profiled, which is a plain call unless
+    profiling is enabled. With use_book, positions in the opening book are
+    answered from it without searching.
+    """
+
+    def __init__(self, search, name=None, use_book=True):
+        self.search = profiled(search, name)
+        self.name = name
+        self.use_book = use_book
+        self.jobs = Queue()
+        self.thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, board, limits=None, callback=None, on_iteration=None):
+        """Queue a search of *board*; callback(handle) runs on the worker thread when it finishes.
+
+        on_iteration(iteration_stats) runs on the worker thread after each completed iteration.
+        A book move finishes the handle at once, and callback then runs on the calling thread.
+        """
+        handle = SearchHandle(board, limits or {}, callback, on_iteration)
+        move = opening_book.book_move(board) if self.use_book else None
+        if move is not None:
+            print(f"Book move: {board.san(move)}")
+            handle._finish(move)
+            return handle
+        with self._lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self.thread.start()
+            self.jobs.put(handle)
+        return handle
+
+    def close(self):
+        """Stop the worker thread after the jobs already queued."""
+        with self._lock:
+            if self.thread is not None:
+                self.jobs.put(None)
+                self.thread.join()
+                self.thread = None
+
+    def _run(self):
+        while True:
+            handle = self.jobs.get()
+            if handle is None:
+                break
+            try:
+                result = self.search(handle.board, stop_event=handle.stop_event, stats=handle.stats, **handle.limits)
+            except Exception as e:
+                print(f"Error in {self.name or 'engine'} search: {e}")
+                result = None
+            handle._finish(result)
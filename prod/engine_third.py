@@ -1,11 +1,27 @@
 import chess
+import functools
 import random
 import time
-import threading
-from queue import Queue
 from collections import defaultdict
 
-from prod.constants import move_time_for_engine, max_depth_for_engine
+from prod.constants import (move_time_for_engine, max_depth_for_engine, transposition_table_size_mb,
+                            eval_cache_size_mb, pawn_hash_size_mb, search_workers, root_split_workers,
+                            soft_time_fraction)
+from prod.engine_service import EngineService
+from prod.eval_cache import EvalCache, early_game_key
+from prod.fast_board import BLACK_OFFSET, PAWN, SearchBoard
+from prod.lazy_smp import LazySMP
+from prod.transposition_table import TranspositionTable, EXACT, LOWER, UPPER, score_from_tt, score_to_tt
+from prod.incremental_eval import EvalSearchBoard, build_eval_tables, material_and_pst
+from prod.mobility import mobility, promotable_pawns
+from prod.move_picker import staged_moves_int
+from prod.pawn_structure import evaluate_pawn_structure
+from prod.quiescence import quiescence_int
+from prod.root_split import root_split_search
+from prod.search import INF, MATE, aspiration_search, search_root
+from prod.search_context import SearchContext, is_quiet_int
+from prod.search_stats import SearchStats
+from prod.see import check_squares, gives_direct_check, see, see_int
 
 # Piece-square tables with improved pawn promotion incentive
 piece_square_tables = {
@@ -83,190 +99,259 @@ king_endgame_pst = [
     -10, -5, -5, -5, -5, -5, -5, -10
 ]
 
-# Transposition table
-transposition_table = {}
+# Transposition table; replaced by a shared one once Lazy-SMP helpers are started
+transposition_table = TranspositionTable(transposition_table_size_mb)
+smp_pool = None
+
+piece_values = {chess.PAWN: 100, chess.KNIGHT: 320, chess.BISHOP: 330,
+                chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 100000}
+
+# Material, PST (king tapered towards king_endgame_pst) and undeveloped-minor penalty
+eval_tables = build_eval_tables(piece_values, piece_square_tables,
+                                eg_pst={chess.KING: king_endgame_pst},
+                                back_rank_penalty={chess.KNIGHT: 30, chess.BISHOP: 30})
+
+# Pawn-structure scores keyed by the pawn-only Zobrist key
+pawn_hash = EvalCache(pawn_hash_size_mb)
 
 def piece_value(piece):
-    values = {chess.PAWN: 100, chess.KNIGHT: 320, chess.BISHOP: 330,
-              chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 100000}
-    return values.get(piece.piece_type, 0)
+    return piece_values.get(piece.piece_type, 0)
 
 def evaluate_board(board):
-    if board.is_checkmate():
-        return -100000 if board.turn == chess.WHITE else 100000
-    if board.is_stalemate() or board.is_insufficient_material():
+    """Score of a SearchBoard from White's point of view.
+
+    Checkmate and stalemate are scored by the search itself, which sees the legal moves.
+    """
+    if board.is_insufficient_material():
         return 0
 
-    score = 0
-    undeveloped_penalty = 0
+    score = material_and_pst(board, eval_tables)
     mobility_bonus = 0
     king_safety = 0
     pawn_structure = 0
 
-    # Material and PST
-    total_material = 0
-    for square, piece in board.piece_map().items():
-        value = piece_value(piece)
-        total_material += value if piece.color == chess.WHITE else -value
-        rank = chess.square_rank(square)
-
-        if piece.color == chess.WHITE:
-            score += value
-            if piece.piece_type in piece_square_tables:
-                if piece.piece_type == chess.KING and abs(total_material) < 1500:  # Endgame
-                    score += king_endgame_pst[square]
-                else:
-                    score += piece_square_tables[piece.piece_type][square]
-            if piece.piece_type in (chess.KNIGHT, chess.BISHOP) and rank == 0:
-                undeveloped_penalty -= 30
-        else:
-            score -= value
-            if piece.piece_type in piece_square_tables:
-                if piece.piece_type == chess.KING and abs(total_material) < 1500:  # Endgame
-                    score -= king_endgame_pst[63 - square]
-                else:
-                    score -= piece_square_tables[piece.piece_type][63 - square]
-            if piece.piece_type in (chess.KNIGHT, chess.BISHOP) and rank == 7:
-                undeveloped_penalty += 30
-
-    # Promotion bonus
-    for move in board.legal_moves:
-        if move.promotion:
-            score += 500 if board.turn == chess.WHITE else -500
+    # Promotion bonus for the side to move's pawns that can promote next move
+    promotions = promotable_pawns(board, board.turn) * 500
+    score += promotions if board.turn == chess.WHITE else -promotions
 
-    # Mobility
-    mobility_bonus += len(list(board.legal_moves)) * 5 if board.turn == chess.WHITE else -len(list(board.legal_moves)) * 5
+    # Mobility of both sides from attack bitboards
+    mobility_bonus += (mobility(board, chess.WHITE) - mobility(board, chess.BLACK)) * 5
 
     # King safety (simple pawn shield)
-    wk = board.king(chess.WHITE)
-    bk = board.king(chess.BLACK)
+    wk = board.king_square(chess.WHITE)
+    bk = board.king_square(chess.BLACK)
     if wk and board.ply() < 20:  # Early game
-        for sq in chess.SquareSet(chess.BB_FILES[chess.square_file(wk)] & chess.BB_RANKS[1]):
-            if board.piece_at(sq) == chess.Piece(chess.PAWN, chess.WHITE):
-                king_safety += 20
+        if board.pieces[PAWN] & chess.BB_FILES[chess.square_file(wk)] & chess.BB_RANK_2:
+            king_safety += 20
     if bk and board.ply() < 20:
-        for sq in chess.SquareSet(chess.BB_FILES[chess.square_file(bk)] & chess.BB_RANKS[6]):
-            if board.piece_at(sq) == chess.Piece(chess.PAWN, chess.BLACK):
-                king_safety -= 20
+        if board.pieces[PAWN + BLACK_OFFSET] & chess.BB_FILES[chess.square_file(bk)] & chess.BB_RANK_7:
+            king_safety -= 20
 
-    # Pawn structure evaluation
-    pawn_structure = evaluate_pawn_structure(board)
+    # Pawn structure evaluation, cached by pawn-only key
+    pawn_structure = evaluate_pawn_structure(board, pawn_hash)
 
-    score += undeveloped_penalty + mobility_bonus + king_safety + pawn_structure
-    return score
-
-def evaluate_pawn_structure(board):
-    score = 0
-    for color in [chess.WHITE, chess.BLACK]:
-        pawns = board.pieces(chess.PAWN, color)
-        for pawn in pawns:
-            file = chess.square_file(pawn)
-            rank = chess.square_rank(pawn)
-            if any(board.piece_at(pawn + offset) == chess.Piece(chess.PAWN, color) for offset in [-1, 1]):
-                score += 10 if color == chess.WHITE else -10  # Bonus for supported pawns
-            if not any(board.piece_at(pawn + offset) == chess.Piece(chess.PAWN, 1 - color) for offset in [-1, 1]):
-                score += 20 if color == chess.WHITE else -20  # Bonus for passed pawns
-            if len([p for p in pawns if chess.square_file(p) == file]) > 1:
-                score -= 10 if color == chess.WHITE else 10  # Penalty for doubled pawns
-            if rank == 6 and color == chess.WHITE or rank == 1 and color == chess.BLACK:
-                score += 30 if color == chess.WHITE else -30  # Bonus for advanced pawns
+    score += mobility_bonus + king_safety + pawn_structure
     return score
 
 def order_moves(board, moves):
-    """Order moves with promotions, captures, checks, and killer moves."""
-    killer_moves = getattr(board, 'killer_moves', [None, None])  # Store 2 killer moves per depth
+    """Order root moves with promotions, captures and checks; killers are handled by staged_moves."""
+    checks = check_squares(board)
 
     def move_priority(move):
         if move.promotion:
             return 2000  # High priority for promotions
-        if move in killer_moves:
-            return 1500  # Killer moves
         if board.is_capture(move):
-            victim = board.piece_at(move.to_square)
-            attacker = board.piece_at(move.from_square)
-            victim_value = piece_value(victim) if victim else 0
-            attacker_value = piece_value(attacker) if attacker else 0
-            return victim_value - attacker_value + 1000
-        board.push(move)
-        is_check = board.is_check()
-        board.pop()
-        return 500 if is_check else 0
+            exchange = see(board, move)
+            return exchange + 1000 if exchange >= 0 else exchange  # Losing captures go last
+        return 500 if gives_direct_check(board, move, checks) else 0
 
     return sorted(moves, key=move_priority, reverse=True)
 
-def minimax(board, depth, alpha, beta, maximizing_player):
+# Node counters, killers and history for the running search, reset at the root
+search_context = SearchContext()
+
+# Static evaluations from White's point of view, shared across iterations
+eval_cache = EvalCache(eval_cache_size_mb)
+
+def new_game():
+    """Forget everything kept between searches, so the next search starts from scratch."""
+    search_context.clear()
+    eval_cache.clear()
+    transposition_table.clear()
+    pawn_hash.clear()
+
+def set_hash_size(size_mb):
+    """Replace the transposition table with an empty one of size_mb; Lazy-SMP helpers restart on the next search."""
+    global transposition_table_size_mb, transposition_table
+    close_smp_pool()
+    transposition_table_size_mb = size_mb
+    transposition_table = TranspositionTable(size_mb)
+
+def root_board(board):
+    """The board negamax searches, built from a chess.Board at the root: an EvalSearchBoard with int moves."""
+    return EvalSearchBoard.from_board(board, eval_tables=eval_tables)
+
+def evaluate_relative(board):
+    """evaluate_board from the side to move's point of view, as negamax expects, through eval_cache."""
+    key = board.zobrist_key
+    if board.ply() < 20:
+        key ^= early_game_key  # King safety only counts in the early game
+    score = eval_cache.probe(key)
+    if score is None:
+        score = evaluate_board(board)
+        eval_cache.store(key, score)
+    return score if board.turn == chess.WHITE else -score
+
+def negamax(board, depth, alpha, beta):
+    """Principal variation search on a root_board(); non-PV moves get a zero-window search first."""
+    ply = len(board.undo) - search_context.root_ply
+    if ply > search_context.seldepth:
+        search_context.seldepth = ply
     # Transposition table lookup
-    pos_key = board.board_fen()
-    if pos_key in transposition_table:
-        stored_score, stored_depth, stored_flag = transposition_table[pos_key]
+    pos_key = board.zobrist_key
+    hash_move = None
+    entry = transposition_table.probe(pos_key)
+    search_context.tt_probes += 1
+    if entry:
+        search_context.tt_hits += 1
+        stored_score, stored_depth, stored_flag, hash_move = entry
+        stored_score = score_from_tt(stored_score, ply)
         if stored_depth >= depth:
-            if stored_flag == "exact":
+            if stored_flag == EXACT:
                 return stored_score
-            elif stored_flag == "lower" and stored_score >= beta:
+            elif stored_flag == LOWER and stored_score >= beta:
                 return stored_score
-            elif stored_flag == "upper" and stored_score <= alpha:
+            elif stored_flag == UPPER and stored_score <= alpha:
                 return stored_score
 
-    if depth == 0 or board.is_game_over():
-        score = evaluate_board(board)
-        transposition_table[pos_key] = (score, depth, "exact")
+    if depth <= 0:
+        score = quiescence_int(board, alpha, beta, evaluate_relative, search_context)
+        if score <= alpha:
+            flag = UPPER
+        elif score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        transposition_table.store(pos_key, 0, score_to_tt(score, ply), flag)
         return score
-
-    legal_moves = order_moves(board, list(board.legal_moves))
+    search_context.nodes += 1
+    search_context.poll()
 
     # Futility pruning
-    if depth <= 2 and not board.is_check():
-        static_eval = evaluate_board(board)
-        if maximizing_player and static_eval + 500 < alpha:
-            transposition_table[pos_key] = (static_eval, depth, "upper")
-            return static_eval
-        if not maximizing_player and static_eval - 500 > beta:
-            transposition_table[pos_key] = (static_eval, depth, "lower")
+    in_check = board.is_check()
+    if depth <= 2 and not in_check:
+        static_eval = evaluate_relative(board)
+        if static_eval + 500 < alpha:
+            transposition_table.store(pos_key, depth, score_to_tt(static_eval, ply), UPPER)
             return static_eval
 
-    if maximizing_player:
-        max_eval = float('-inf')
-        for i, move in enumerate(legal_moves):
-            board.push(move)
-            # Late Move Reductions
-            if i > 3 and depth > 2 and not move.promotion and not board.is_check():
-                eval = minimax(board, depth - 2, alpha, beta, False)
-                if eval > alpha:
-                    eval = minimax(board, depth - 1, alpha, beta, False)
+    alpha_orig = alpha
+    best_value = -INF
+    best_move = None
+    tried_quiets = []
+    for i, move in enumerate(staged_moves_int(board, hash_move, search_context.killers_at(ply),
+                                              search_context.history_for(board))):
+        quiet = is_quiet_int(board, move)
+        # Late Move Reductions apply to quiet moves and captures that lose material
+        reducible = i > 3 and depth > 2 and (quiet or (not move >> 12 and see_int(board, move) < 0))
+        board.make(move)
+        if i == 0:
+            value = -negamax(board, depth - 1, -beta, -alpha)
+        else:
+            if reducible and not board.is_check():
+                value = -negamax(board, depth - 2, -alpha - 1, -alpha)
             else:
-                eval = minimax(board, depth - 1, alpha, beta, False)
-            board.pop()
-            if eval > max_eval:
-                max_eval = eval
-                if depth == max_depth_for_engine:  # Store killer move at root
-                    board.killer_moves = [move, board.killer_moves[0]]
-            alpha = max(alpha, eval)
-            if beta <= alpha:
-                break
-        transposition_table[pos_key] = (max_eval, depth, "exact")
-        return max_eval
+                value = alpha + 1  # Always run the zero-window search below
+            if value > alpha:
+                value = -negamax(board, depth - 1, -alpha - 1, -alpha)
+                if alpha < value < beta:
+                    value = -negamax(board, depth - 1, -beta, -alpha)
+        board.unmake()
+        if value > best_value:
+            best_value = value
+            best_move = move
+            if value > alpha:
+                alpha = value
+        if alpha >= beta:
+            search_context.count_cutoff(i)
+            if quiet:
+                search_context.store_killer(ply, move)
+                search_context.update_history(board.turn, move, depth, tried_quiets)
+            break
+        if quiet:
+            tried_quiets.append(move)
+
+    if best_value == -INF:
+        # No legal moves
+        score = -(MATE - ply) if in_check else 0
+        transposition_table.store(pos_key, depth, score_to_tt(score, ply), EXACT)
+        return score
+    if best_value <= alpha_orig:
+        flag = UPPER
+    elif best_value >= beta:
+        flag = LOWER
     else:
-        min_eval = float('inf')
-        for i, move in enumerate(legal_moves):
-            board.push(move)
-            if i > 3 and depth > 2 and not move.promotion and not board.is_check():
-                eval = minimax(board, depth - 2, alpha, beta, True)
-                if eval < beta:
-                    eval = minimax(board, depth - 1, alpha, beta, True)
-            else:
-                eval = minimax(board, depth - 1, alpha, beta, True)
-            board.pop()
-            if eval < min_eval:
-                min_eval = eval
-                if depth == max_depth_for_engine:
-                    board.killer_moves = [move, board.killer_moves[0]]
-            beta = min(beta, eval)
-            if beta <= alpha:
-                break
-        transposition_table[pos_key] = (min_eval, depth, "exact")
-        return min_eval
-
-def get_best_move_with_time_limitation(board, max_time=move_time_for_engine, max_depth=max_depth_for_engine, result_queue=None):
+        flag = EXACT
+    transposition_table.store(pos_key, depth, score_to_tt(best_value, ply), flag, best_move)
+    return best_value
+
+def get_smp_pool(workers):
+    """Start (or resize) the Lazy-SMP helpers and switch to their shared transposition table."""
+    global smp_pool, transposition_table
+    if smp_pool is None or smp_pool.helpers != workers - 1:
+        close_smp_pool()
+        smp_pool = LazySMP(__name__, workers - 1, transposition_table_size_mb)
+        smp_pool.table.age = transposition_table.age
+        transposition_table = smp_pool.table
+    return smp_pool
+
+def close_smp_pool():
+    global smp_pool, transposition_table
+    if smp_pool is not None:
+        smp_pool.close()
+        smp_pool = None
+        transposition_table = TranspositionTable(transposition_table_size_mb)
+
+def helper_search(board, max_time, max_depth, helper_id, stop_event):
+    """Lazy-SMP helper: search the same root with a depth offset and shuffled root moves.
+
+    The result is discarded; the point is filling the shared transposition table
+    with entries the main search has not reached yet.
+    """
+    start_time = time.time()
+    legal_moves = [SearchBoard.move_from_chess(move) for move in order_moves(board, list(board.legal_moves))]
+    if not legal_moves:
+        return
+    board = root_board(board)
+    search_context.new_search(board)
+    search_context.set_limits(start_time + max_time, stop_event)
+    later_moves = legal_moves[1:]
+    random.Random(helper_id).shuffle(later_moves)
+    legal_moves = legal_moves[:1] + later_moves
+
+    best_value = None
+    for depth in range(1 + helper_id % 2, max_depth + 1):
+        value, best_move, completed = aspiration_search(
+            board, legal_moves, depth, best_value, negamax, start_time + max_time, stop_event=stop_event)
+        if not completed:
+            return
+        best_value = value
+        legal_moves.remove(best_move)
+        legal_moves.insert(0, best_move)
+
+def get_best_move_with_time_limitation(board, max_time=move_time_for_engine, max_depth=max_depth_for_engine, result_queue=None,
+                                       workers=search_workers, root_workers=root_split_workers, stop_event=None, stats=None,
+                                       max_nodes=None):
+    """Iterative deepening until max_depth, the time limits, max_nodes or stop_event.
+
+    No new iteration starts after soft_time_fraction of max_time; the tree is
+    abandoned mid-iteration at 80% of max_time, after max_nodes nodes or when
+    stop_event is set, and the best move of the last completed iteration is
+    returned. Every completed iteration is recorded in stats, a SearchStats
+    that can stream them. The tree is searched on root_board(board) with int
+    moves, converted back to chess.Move on the way out.
+    """
+    smp = None
     try:
         print(f'Calculating best move (max time: {max_time}s)...')
         if not board.legal_moves:
@@ -278,47 +363,57 @@ def get_best_move_with_time_limitation(board, max_time=move_time_for_engine, max
         start_time = time.time()
         last_check = start_time
         best_move = None
-        legal_moves = order_moves(board, list(board.legal_moves))
-        board.killer_moves = [None, None]
+        best_value = None
+        smp = get_smp_pool(workers) if workers > 1 else None
+        legal_moves = [SearchBoard.move_from_chess(move) for move in order_moves(board, list(board.legal_moves))]
+        to_chess = SearchBoard.move_to_chess
+        transposition_table.new_search()
+        if smp:
+            smp.start_search(board, max_time * 0.8, max_depth)
+        board = root_board(board)
+        search_context.new_search(board)
+        eval_cache.reset_stats()
+        deadline = start_time + max_time * 0.8
+        search_context.set_limits(deadline, stop_event, max_nodes)
+        if stats is None:
+            stats = SearchStats()
+
+        root_search = search_root
+        if root_workers > 1:
+            # Split the root moves after the PV move across a persistent process pool
+            root_search = functools.partial(root_split_search, __name__, workers=root_workers, context=search_context)
 
-        is_maximizing = board.turn == chess.WHITE
         for depth in range(1, max_depth + 1):
             current_time = time.time()
             if current_time - last_check >= 10:
                 print(f"\rElapsed time: {current_time - start_time:.2f} seconds")
                 last_check = current_time
+            if depth > 1 and current_time - start_time >= max_time * soft_time_fraction:
+                print(f"Soft time limit reached after depth {depth - 1}.")
+                break
+            if depth > 1 and stop_event is not None and stop_event.is_set():
+                print(f"Stopped after depth {depth - 1}.")
+                break
 
-            current_best_move = None
-            best_value = float('-inf') if is_maximizing else float('inf')
-            alpha = float('-inf')
-            beta = float('inf')
-
-            for move in legal_moves:
-                board.push(move)
-                value = minimax(board, depth - 1, alpha, beta, not is_maximizing)
-                board.pop()
-
-                if is_maximizing:
-                    if value > best_value:
-                        best_value = value
-                        current_best_move = move
-                    alpha = max(alpha, value)
-                else:
-                    if value < best_value:
-                        best_value = value
-                        current_best_move = move
-                    beta = min(beta, value)
-
-                elapsed_time = time.time() - start_time
-                if elapsed_time >= max_time * 0.8:
-                    print(f"Time limit reached at depth {depth - 1}. Best move so far returned.")
-                    if result_queue:
-                        result_queue.put(best_move if best_move else current_best_move)
-                    return best_move if best_move else current_best_move
-
-            best_move = current_best_move
-            print(f"Completed depth {depth} in {time.time() - start_time:.2f}s")
-
+            value, current_best_move, completed = aspiration_search(
+                board, legal_moves, depth, best_value, negamax, deadline, root_search, stop_event)
+            if not completed:
+                print(f"Time limit reached at depth {depth - 1}. Best move so far returned.")
+                move = to_chess(best_move or current_best_move or legal_moves[0])
+                if result_queue:
+                    result_queue.put(move)
+                return move
+
+            best_move, best_value = current_best_move, value
+            search_context.completed_depth = depth
+            # Search the previous best move first so the next iteration has a PV to follow
+            legal_moves.remove(best_move)
+            legal_moves.insert(0, best_move)
+            pv = [to_chess(move) for move in transposition_table.principal_variation(board, best_move, depth)]
+            iteration = stats.record(search_context, depth, value, pv, time.time() - start_time)
+            print(f"Completed {iteration}, eval cache hits {eval_cache.hit_rate():.0%}")
+
+        best_move = to_chess(best_move) if best_move else None
         if result_queue:
             result_queue.put(best_move)
         return best_move
@@ -327,17 +422,24 @@ def get_best_move_with_time_limitation(board, max_time=move_time_for_engine, max
         if result_queue:
             result_queue.put(None)
         return None
+    finally:
+        if smp:
+            smp.stop_search()
+
+
+# Worker thread that runs this engine's searches and keeps its state warm
+engine_service = EngineService(get_best_move_with_time_limitation, name=__name__)
 
+def get_best_move_async_third(board, max_time=move_time_for_engine, max_depth=max_depth_for_engine,
+                              workers=search_workers, callback=None, on_iteration=None):
+    """Queue the search on the engine's worker thread and return its SearchHandle.
 
-def get_best_move_async_third(board, max_time=move_time_for_engine, max_depth=max_depth_for_engine):
-    """Run move calculation in a separate thread and return the result via a queue."""
-    result_queue = Queue()
-    thread = threading.Thread(
-        target=get_best_move_with_time_limitation,
-        args=(board.copy(), max_time, max_depth, result_queue)
-    )
-    thread.start()
-    return result_queue
+    With workers > 1, workers - 1 Lazy-SMP helper processes search alongside it.
+    handle.cancel() makes the search return its best move right away; handle.stats
+    collects the per-iteration statistics, also passed to on_iteration as they complete.
+    """
+    return engine_service.submit(board, {'max_time': max_time, 'max_depth': max_depth, 'workers': workers},
+                                 callback, on_iteration)
 
 def get_random_engine_move(board):
     print('Random move!')
@@ -9,7 +9,6 @@ from prod.engine_third import get_best_move_async_third
 from prod.game_logic import print_outcome
 from prod.board_display_gui import ChessGUI  # Import GUI
 import time
-from queue import Queue
 import tkinter as tk
 from tkinter import messagebox
 
@@ -24,16 +23,11 @@ def get_greedy_engine_move(board):
 
         return max(capture_moves, key=capture_value)  # Simplified, no default needed
 
-    # Fallback to Minimax, but extract the move from the Queue
-    result_queue = get_best_move_async(board, max_time=1, max_depth=7)
-    move = None
-    start_time = time.time()
-    while time.time() - start_time < 20 and move is None:
-        if not result_queue.empty():
-            move = result_queue.get()
-            break
-        time.sleep(0.01)  # Wait briefly to avoid busy-waiting
+    # Fallback to Minimax, waiting on its search handle
+    search = get_best_move_async(board, max_time=1, max_depth=7)
+    move = search.wait(timeout=20)
     if move is None:
+        search.cancel()  # Don't leave the search running behind us
         print("Greedy engine Minimax fallback timed out, selecting random move.")
         move = random.choice(legal_moves) if legal_moves else None
     return move
@@ -54,6 +48,11 @@ ENGINES = {
     # Add more engines here as needed (e.g., greedy)
 }
 
+# Engines that search on a worker thread and return a SearchHandle
+SEARCH_ENGINES = ("Minimax", "Minimax Second", "Minimax mistral")
+# Extra wait past the move time before a search is told to stop
+engine_grace_time = 1
+
 
 
 
@@ -99,24 +98,25 @@ def play_game(white_engine_func, black_engine_func, white_name, black_name, game
         engine_name = white_name if board.turn == chess.WHITE else black_name
 
         # Handle engine move
-        move_result = current_engine(board)
-
-        if engine_name in ("Minimax","Minimax Second"):  # Minimax returns a Queue
-            result_queue = move_result
-            move = None
+        if engine_name in SEARCH_ENGINES:  # Minimax returns a SearchHandle
+            search = current_engine(board)
             start_time = time.time()
-            while time.time() - start_time < move_time_for_engine and move is None:  # Wait up to 2 seconds
-                if not result_queue.empty():
-                    move = result_queue.get()
-                    break
-                time.sleep(0.01)  # Shorter sleep to avoid blocking GUI
+            # The search stops itself at its hard limit; the grace covers queueing
+            while time.time() - start_time < move_time_for_engine + engine_grace_time and not search.done():
                 if gui:
+                    time.sleep(0.01)  # Shorter sleep to avoid blocking GUI
                     root.update()  # Keep GUI responsive while waiting
+                else:
+                    search.wait(timeout=move_time_for_engine + engine_grace_time)
+            if not search.done():
+                # Ask the search for its best move so far instead of abandoning it
+                search.cancel()
+            move = search.wait(timeout=engine_grace_time)
             if move is None:
                 print(f"{engine_name} timed out, selecting random move.")
                 move = random.choice(list(board.legal_moves)) if board.legal_moves else None
         else:  # Random or Greedy returns a Move directly
-            move = move_result
+            move = current_engine(board)
 
         if move and move in board.legal_moves:
             san_move = board.san(move)
@@ -0,0 +1,60 @@
+from array import array
+
+from prod.zobrist import ZobristBoard, zobrist_hash
+
+# Key and score per slot
+ENTRY_BYTES = 12
+# Mixed into the key of evaluations that depend on the game still being in its opening
+early_game_key = 0x9E3779B97F4A7C15
+# Mixed into every stored key, so a zero key (a pawnless board's pawn key) never matches an empty slot
+slot_key_salt = 0xD1B54A32D192ED03
+
+
+def position_key(board):
+    """Zobrist key of *board*, incremental when the board maintains one."""
+    return board.zobrist_key if isinstance(board, ZobristBoard) else zobrist_hash(board)
+
+
+class EvalCache:
+    """Fixed-size, direct-mapped cache of static evaluations keyed by Zobrist hash.
+
+    A store always overwrites its slot. probes and hits count lookups since
+    the last reset_stats() so the hit rate can be reported per search.
+    """
+
+    def __init__(self, size_mb=8):
+        entries = max(1, size_mb * 1024 * 1024 // ENTRY_BYTES)
+        self.size = 1 << (entries.bit_length() - 1)  # Power of two so we can mask
+        self.mask = self.size - 1
+        self.keys = array('Q', [0]) * self.size
+        self.scores = array('i', [0]) * self.size
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key):
+        """Return the cached score for *key*, or None on a miss."""
+        self.probes += 1
+        key ^= slot_key_salt
+        index = key & self.mask
+        if self.keys[index] != key:
+            return None
+        self.hits += 1
+        return self.scores[index]
+
+    def store(self, key, score):
+        key ^= slot_key_salt
+        index = key & self.mask
+        self.keys[index] = key
+        self.scores[index] = score
+
+    def clear(self):
+        self.keys = array('Q', [0]) * self.size
+        self.scores = array('i', [0]) * self.size
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
@@ -0,0 +1,471 @@
+import chess
+
+from prod.transposition_table import decode_move, encode_move
+from prod.zobrist import (castling_index, castling_keys, en_passant_keys, pawn_zobrist_hash, piece_square_keys, side_key,
+                          zobrist_hash)
+
+# Piece indices follow zobrist.piece_index: 0-5 white pawn..king, 6-11 black pawn..king
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+BLACK_OFFSET = 6
+EMPTY = -1
+
+# Castling right bits, matching zobrist.castling_index
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+
+# Rights that survive a move touching each square (king or rook leaving, rook captured)
+castling_masks = [15] * 64
+castling_masks[chess.E1] &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+castling_masks[chess.H1] &= ~WHITE_KINGSIDE
+castling_masks[chess.A1] &= ~WHITE_QUEENSIDE
+castling_masks[chess.E8] &= ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+castling_masks[chess.H8] &= ~BLACK_KINGSIDE
+castling_masks[chess.A8] &= ~BLACK_QUEENSIDE
+
+# Precomputed attack tables (python-chess builds the sliding ones as occupancy lookups)
+knight_attacks = chess.BB_KNIGHT_ATTACKS
+king_attacks = chess.BB_KING_ATTACKS
+pawn_attacks = chess.BB_PAWN_ATTACKS  # [color][square]
+diag_masks, diag_attacks = chess.BB_DIAG_MASKS, chess.BB_DIAG_ATTACKS
+file_masks, file_attacks = chess.BB_FILE_MASKS, chess.BB_FILE_ATTACKS
+rank_masks, rank_attacks = chess.BB_RANK_MASKS, chess.BB_RANK_ATTACKS
+square_bbs = chess.BB_SQUARES
+# between_masks[a][b]: squares strictly between a and b on a shared line, else 0
+between_masks = [[chess.between(a, b) for b in chess.SQUARES] for a in chess.SQUARES]
+BB_ALL = chess.BB_ALL
+
+promotion_pieces = (chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT)
+
+
+def bishop_attacks(square, occupied):
+    return diag_attacks[square][diag_masks[square] & occupied]
+
+
+def rook_attacks(square, occupied):
+    return file_attacks[square][file_masks[square] & occupied] | rank_attacks[square][rank_masks[square] & occupied]
+
+
+def scan(bb):
+    """Squares of the set bits of *bb*, lowest first."""
+    while bb:
+        lsb = bb & -bb
+        yield lsb.bit_length() - 1
+        bb ^= lsb
+
+
+class SearchBoard:
+    """Compact board for the inner search: int bitboards, int moves and make/unmake.
+
+    Moves are 16-bit ints from | to << 6 | promotion << 12, the same packing
+    the transposition table uses, so encode_move/decode_move convert them.
+    zobrist_key uses the prod.zobrist keys and always equals zobrist_hash() of
+    the equivalent chess.Board, and pawn_key its pawn_zobrist_hash(). Only
+    standard chess is supported, and there is no move history: build one
+    from a chess.Board at the search root.
+    """
+
+    __slots__ = ('pieces', 'colors', 'occupied', 'mailbox', 'turn', 'castling', 'ep_square',
+                 'halfmove_clock', 'fullmove_number', 'zobrist_key', 'pawn_key', 'undo')
+
+    def __init__(self):
+        self.pieces = [0] * 12
+        self.colors = [0, 0]  # Indexed by chess.BLACK / chess.WHITE
+        self.occupied = 0
+        self.mailbox = [EMPTY] * 64
+        self.turn = chess.WHITE
+        self.castling = 0
+        self.ep_square = None
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.zobrist_key = 0
+        self.pawn_key = 0
+        self.undo = []
+
+    @classmethod
+    def from_board(cls, board, **kwargs):
+        """Copy the current position of a chess.Board (not its move stack)."""
+        search_board = cls(**kwargs)
+        for square, piece in board.piece_map().items():
+            search_board._put(square, piece.piece_type - 1 + (0 if piece.color else BLACK_OFFSET))
+        search_board.turn = board.turn
+        search_board.castling = castling_index(board.clean_castling_rights())
+        search_board.ep_square = board.ep_square
+        search_board.halfmove_clock = board.halfmove_clock
+        search_board.fullmove_number = board.fullmove_number
+        search_board.zobrist_key = zobrist_hash(board)
+        search_board.pawn_key = pawn_zobrist_hash(board)
+        return search_board
+
+    @classmethod
+    def from_fen(cls, fen):
+        return cls.from_board(chess.Board(fen))
+
+    def fen(self):
+        rows = []
+        for rank in range(7, -1, -1):
+            row = ''
+            empty = 0
+            for file in range(8):
+                index = self.mailbox[rank * 8 + file]
+                if index == EMPTY:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                symbol = chess.piece_symbol(index % 6 + 1)
+                row += symbol.upper() if index < BLACK_OFFSET else symbol
+            rows.append(row + (str(empty) if empty else ''))
+        castling = ''.join(flag for bit, flag in ((WHITE_KINGSIDE, 'K'), (WHITE_QUEENSIDE, 'Q'),
+                                                  (BLACK_KINGSIDE, 'k'), (BLACK_QUEENSIDE, 'q'))
+                           if self.castling & bit) or '-'
+        ep = chess.square_name(self.ep_square) if self.ep_square is not None else '-'
+        return (f"{'/'.join(rows)} {'w' if self.turn else 'b'} {castling} {ep} "
+                f"{self.halfmove_clock} {self.fullmove_number}")
+
+    def to_board(self):
+        return chess.Board(self.fen())
+
+    def copy(self):
+        board = self.__class__()
+        board.pieces = self.pieces[:]
+        board.colors = self.colors[:]
+        board.occupied = self.occupied
+        board.mailbox = self.mailbox[:]
+        board.turn = self.turn
+        board.castling = self.castling
+        board.ep_square = self.ep_square
+        board.halfmove_clock = self.halfmove_clock
+        board.fullmove_number = self.fullmove_number
+        board.zobrist_key = self.zobrist_key
+        board.pawn_key = self.pawn_key
+        board.undo = self.undo[:]
+        return board
+
+    # Piece placement; each keeps the bitboards, mailbox and Zobrist keys in step
+
+    def _put(self, square, index):
+        bb = square_bbs[square]
+        self.pieces[index] |= bb
+        self.colors[index < BLACK_OFFSET] |= bb
+        self.occupied |= bb
+        self.mailbox[square] = index
+        self.zobrist_key ^= piece_square_keys[index * 64 + square]
+        if index % 6 == PAWN:
+            self.pawn_key ^= piece_square_keys[index * 64 + square]
+
+    def _remove(self, square, index):
+        bb = square_bbs[square]
+        self.pieces[index] ^= bb
+        self.colors[index < BLACK_OFFSET] ^= bb
+        self.occupied ^= bb
+        self.mailbox[square] = EMPTY
+        self.zobrist_key ^= piece_square_keys[index * 64 + square]
+        if index % 6 == PAWN:
+            self.pawn_key ^= piece_square_keys[index * 64 + square]
+
+    def _move_piece(self, from_square, to_square, index):
+        bb = square_bbs[from_square] | square_bbs[to_square]
+        self.pieces[index] ^= bb
+        self.colors[index < BLACK_OFFSET] ^= bb
+        self.occupied ^= bb
+        self.mailbox[from_square] = EMPTY
+        self.mailbox[to_square] = index
+        key_delta = piece_square_keys[index * 64 + from_square] ^ piece_square_keys[index * 64 + to_square]
+        self.zobrist_key ^= key_delta
+        if index % 6 == PAWN:
+            self.pawn_key ^= key_delta
+
+    # Attacks
+
+    def king_square(self, color):
+        king = self.pieces[KING if color else KING + BLACK_OFFSET]
+        return king.bit_length() - 1 if king else None
+
+    def attackers_mask(self, color, square):
+        """Pieces of *color* attacking *square*."""
+        offset = 0 if color else BLACK_OFFSET
+        pieces = self.pieces
+        queens = pieces[QUEEN + offset]
+        return ((knight_attacks[square] & pieces[KNIGHT + offset])
+                | (king_attacks[square] & pieces[KING + offset])
+                | (pawn_attacks[not color][square] & pieces[PAWN + offset])
+                | (bishop_attacks(square, self.occupied) & (pieces[BISHOP + offset] | queens))
+                | (rook_attacks(square, self.occupied) & (pieces[ROOK + offset] | queens)))
+
+    def attacks_mask(self, square):
+        """Squares attacked by the piece on *square*."""
+        index = self.mailbox[square]
+        if index == EMPTY:
+            return 0
+        piece = index % 6
+        if piece == PAWN:
+            return pawn_attacks[index < BLACK_OFFSET][square]
+        if piece == KNIGHT:
+            return knight_attacks[square]
+        if piece == KING:
+            return king_attacks[square]
+        attacks = 0
+        if piece != ROOK:
+            attacks = bishop_attacks(square, self.occupied)
+        if piece != BISHOP:
+            attacks |= rook_attacks(square, self.occupied)
+        return attacks
+
+    def is_attacked_by(self, color, square):
+        return bool(self.attackers_mask(color, square))
+
+    def is_check(self):
+        king = self.king_square(self.turn)
+        return king is not None and self.is_attacked_by(not self.turn, king)
+
+    def is_insufficient_material(self):
+        """Bare kings, or kings and a single minor piece (python-chess also knows same-coloured bishops)."""
+        pieces = self.pieces
+        if (pieces[PAWN] | pieces[ROOK] | pieces[QUEEN]
+                | pieces[PAWN + BLACK_OFFSET] | pieces[ROOK + BLACK_OFFSET] | pieces[QUEEN + BLACK_OFFSET]):
+            return False
+        minors = (pieces[KNIGHT] | pieces[BISHOP] | pieces[KNIGHT + BLACK_OFFSET] | pieces[BISHOP + BLACK_OFFSET])
+        return not minors & (minors - 1)
+
+    # Move generation
+
+    def pseudo_legal_moves(self):
+        """Moves that obey piece movement but may leave the own king in check."""
+        us = self.turn
+        offset = 0 if us else BLACK_OFFSET
+        own = self.colors[us]
+        enemy = self.colors[not us]
+        occupied = self.occupied
+        pieces = self.pieces
+        moves = []
+        append = moves.append
+
+        not_own = ~own
+        for from_square in scan(pieces[KNIGHT + offset]):
+            for to_square in scan(knight_attacks[from_square] & not_own):
+                append(from_square | to_square << 6)
+        queens = pieces[QUEEN + offset]
+        for from_square in scan(pieces[BISHOP + offset] | queens):
+            for to_square in scan(bishop_attacks(from_square, occupied) & not_own):
+                append(from_square | to_square << 6)
+        for from_square in scan(pieces[ROOK + offset] | queens):
+            for to_square in scan(rook_attacks(from_square, occupied) & not_own):
+                append(from_square | to_square << 6)
+        for from_square in scan(pieces[KING + offset]):
+            for to_square in scan(king_attacks[from_square] & not_own):
+                append(from_square | to_square << 6)
+
+        # Pawns
+        pawns = pieces[PAWN + offset]
+        if us:
+            single = (pawns << 8) & ~occupied & BB_ALL
+            double = ((single & chess.BB_RANK_3) << 8) & ~occupied
+            forward, last_rank = 8, chess.BB_RANK_8
+        else:
+            single = (pawns >> 8) & ~occupied
+            double = ((single & chess.BB_RANK_6) >> 8) & ~occupied
+            forward, last_rank = -8, chess.BB_RANK_1
+        for to_square in scan(single):
+            from_square = to_square - forward
+            if square_bbs[to_square] & last_rank:
+                for promotion in promotion_pieces:
+                    append(from_square | to_square << 6 | promotion << 12)
+            else:
+                append(from_square | to_square << 6)
+        for to_square in scan(double):
+            append((to_square - 2 * forward) | to_square << 6)
+        capture_targets = enemy
+        if self.ep_square is not None:
+            capture_targets |= square_bbs[self.ep_square]
+        for from_square in scan(pawns):
+            for to_square in scan(pawn_attacks[us][from_square] & capture_targets):
+                if square_bbs[to_square] & last_rank:
+                    for promotion in promotion_pieces:
+                        append(from_square | to_square << 6 | promotion << 12)
+                else:
+                    append(from_square | to_square << 6)
+
+        # Castling: the rights imply king and rook are on their home squares
+        them = not us
+        if us and self.castling & (WHITE_KINGSIDE | WHITE_QUEENSIDE):
+            if (self.castling & WHITE_KINGSIDE and not occupied & (chess.BB_F1 | chess.BB_G1)
+                    and not self._any_attacked(them, (chess.E1, chess.F1, chess.G1))):
+                append(chess.E1 | chess.G1 << 6)
+            if (self.castling & WHITE_QUEENSIDE and not occupied & (chess.BB_B1 | chess.BB_C1 | chess.BB_D1)
+                    and not self._any_attacked(them, (chess.E1, chess.D1, chess.C1))):
+                append(chess.E1 | chess.C1 << 6)
+        elif not us and self.castling & (BLACK_KINGSIDE | BLACK_QUEENSIDE):
+            if (self.castling & BLACK_KINGSIDE and not occupied & (chess.BB_F8 | chess.BB_G8)
+                    and not self._any_attacked(them, (chess.E8, chess.F8, chess.G8))):
+                append(chess.E8 | chess.G8 << 6)
+            if (self.castling & BLACK_QUEENSIDE and not occupied & (chess.BB_B8 | chess.BB_C8 | chess.BB_D8)
+                    and not self._any_attacked(them, (chess.E8, chess.D8, chess.C8))):
+                append(chess.E8 | chess.C8 << 6)
+        return moves
+
+    def _any_attacked(self, color, squares):
+        return any(self.attackers_mask(color, square) for square in squares)
+
+    def pinned_mask(self, color, king):
+        """Pieces of *color* that are the only blocker between their king and an enemy slider."""
+        offset = BLACK_OFFSET if color else 0
+        pieces = self.pieces
+        queens = pieces[QUEEN + offset]
+        snipers = ((rook_attacks(king, 0) & (pieces[ROOK + offset] | queens))
+                   | (bishop_attacks(king, 0) & (pieces[BISHOP + offset] | queens)))
+        pinned = 0
+        for sniper in scan(snipers):
+            blockers = between_masks[king][sniper] & self.occupied
+            if blockers and not blockers & (blockers - 1):
+                pinned |= blockers & self.colors[color]
+        return pinned
+
+    def _leaves_king_safe(self, move):
+        us = self.turn
+        self.make(move)
+        king = self.king_square(us)
+        safe = king is None or not self.attackers_mask(not us, king)
+        self.unmake()
+        return safe
+
+    def legal_moves(self):
+        """Legal moves; only king moves, pinned pieces, en passant and check evasions are made to be tested."""
+        us = self.turn
+        king = self.king_square(us)
+        moves = self.pseudo_legal_moves()
+        if king is None or self.attackers_mask(not us, king):
+            return [move for move in moves if self._leaves_king_safe(move)]
+        careful = self.pinned_mask(us, king) | square_bbs[king]
+        ep_square = self.ep_square
+        mailbox = self.mailbox
+        legal = []
+        for move in moves:
+            from_square = move & 63
+            if (careful & square_bbs[from_square]
+                    or ((move >> 6 & 63) == ep_square and mailbox[from_square] % 6 == PAWN)):
+                if not self._leaves_king_safe(move):
+                    continue
+            legal.append(move)
+        return legal
+
+    def is_legal(self, move):
+        return move in self.legal_moves()
+
+    def is_capture(self, move):
+        to_square = move >> 6 & 63
+        return (self.mailbox[to_square] != EMPTY
+                or (to_square == self.ep_square and self.mailbox[move & 63] % 6 == PAWN))
+
+    # Make / unmake
+
+    def make(self, move):
+        from_square = move & 63
+        to_square = move >> 6 & 63
+        promotion = move >> 12
+        index = self.mailbox[from_square]
+        captured = self.mailbox[to_square]
+        ep_square = self.ep_square
+        self.undo.append((move, captured, self.castling, ep_square, self.halfmove_clock, self.zobrist_key))
+
+        key_delta = side_key
+        if ep_square is not None:
+            key_delta ^= en_passant_keys[ep_square & 7]
+
+        piece = index % 6
+        if captured != EMPTY:
+            self._remove(to_square, captured)
+        elif piece == PAWN and to_square == ep_square:
+            self._remove(to_square - 8 if self.turn else to_square + 8, PAWN + (BLACK_OFFSET if self.turn else 0))
+
+        if promotion:
+            self._remove(from_square, index)
+            self._put(to_square, promotion - 1 + (index - piece))
+        else:
+            self._move_piece(from_square, to_square, index)
+            if piece == KING and abs(to_square - from_square) == 2:
+                rook = index - KING + ROOK
+                if to_square > from_square:
+                    self._move_piece(to_square + 1, to_square - 1, rook)
+                else:
+                    self._move_piece(to_square - 2, to_square + 1, rook)
+
+        castling = self.castling & castling_masks[from_square] & castling_masks[to_square]
+        if castling != self.castling:
+            key_delta ^= castling_keys[self.castling] ^ castling_keys[castling]
+            self.castling = castling
+
+        if piece == PAWN and abs(to_square - from_square) == 16:
+            self.ep_square = (from_square + to_square) // 2
+            key_delta ^= en_passant_keys[from_square & 7]
+        else:
+            self.ep_square = None
+
+        self.halfmove_clock = 0 if piece == PAWN or captured != EMPTY else self.halfmove_clock + 1
+        if not self.turn:
+            self.fullmove_number += 1
+        self.turn = not self.turn
+        self.zobrist_key ^= key_delta
+
+    def unmake(self):
+        move, captured, castling, ep_square, halfmove_clock, key = self.undo.pop()
+        from_square = move & 63
+        to_square = move >> 6 & 63
+        self.turn = not self.turn
+        if not self.turn:
+            self.fullmove_number -= 1
+        index = self.mailbox[to_square]
+        piece = index % 6
+
+        if move >> 12:
+            self._remove(to_square, index)
+            self._put(from_square, PAWN + (index - piece))
+        else:
+            self._move_piece(to_square, from_square, index)
+            if piece == KING and abs(to_square - from_square) == 2:
+                rook = index - KING + ROOK
+                if to_square > from_square:
+                    self._move_piece(to_square - 1, to_square + 1, rook)
+                else:
+                    self._move_piece(to_square + 1, to_square - 2, rook)
+
+        if captured != EMPTY:
+            self._put(to_square, captured)
+        elif piece == PAWN and to_square == ep_square:
+            self._put(to_square - 8 if self.turn else to_square + 8, PAWN + (BLACK_OFFSET if self.turn else 0))
+
+        self.castling = castling
+        self.ep_square = ep_square
+        self.halfmove_clock = halfmove_clock
+        self.zobrist_key = key
+
+    # python-chess names, so the search drivers in prod.search and the
+    # evaluation terms in prod.mobility and prod.pawn_structure run on either board
+    push = make
+    pop = unmake
+
+    @property
+    def move_stack(self):
+        """Moves made since the board was built, oldest first."""
+        return [entry[0] for entry in self.undo]
+
+    @property
+    def occupied_co(self):
+        return self.colors
+
+    @property
+    def pawns(self):
+        return self.pieces[PAWN] | self.pieces[PAWN + BLACK_OFFSET]
+
+    def ply(self):
+        """Half-moves played in the game, counted from fullmove_number like chess.Board.ply()."""
+        return 2 * (self.fullmove_number - 1) + (self.turn == chess.BLACK)
+
+    # Conversion to python-chess moves
+
+    @staticmethod
+    def move_from_chess(move):
+        return encode_move(move)
+
+    @staticmethod
+    def move_to_chess(move):
+        return decode_move(move)
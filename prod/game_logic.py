@@ -3,7 +3,7 @@ import sys
 import random
 import tkinter as tk
 from board_display import print_board
-from prod.constants import move_time_for_engine, max_depth_for_engine
+from prod.constants import move_time_for_engine, max_depth_for_engine, ponder_on_human_turn, ponder_time_limit
 
 
 def print_outcome(board, gui=None):
@@ -27,11 +27,59 @@ def print_outcome(board, gui=None):
 def count_pieces(board):
     return sum(1 for square in chess.SQUARES if board.piece_at(square) is not None)
 
-def human_vs_computer(best_move_async, board, human_color=chess.WHITE, gui=None, root=None):
+def human_vs_computer(best_move_async, board, human_color=chess.WHITE, gui=None, root=None, ponder=ponder_on_human_turn):
+    """Play the engine behind best_move_async against a human on the GUI.
+
+    With ponder, the engine keeps searching during the human's turn: first the
+    human's position, to predict their reply, then the position after that
+    reply. If the human plays the predicted move the ponder search simply gets
+    move_time_for_engine more; otherwise it is stopped and a fresh search
+    starts, reusing whatever the engine kept (transposition table, history).
+    """
     print("Initial position:")
     print_board(board, gui)
     move_number = 0
     last_move_stack_size = len(board.move_stack)
+    ponder_search = None
+    ponder_move = None  # Predicted human reply; None while still predicting it
+    ponder_ply = 0
+
+    def start_ponder():
+        nonlocal ponder_search, ponder_move, ponder_ply
+        ponder_move = None
+        ponder_ply = len(board.move_stack)
+        ponder_search = best_move_async(board, max_time=move_time_for_engine, max_depth=max_depth_for_engine)
+
+    def update_ponder():
+        """Once the reply is predicted, ponder on the position after it."""
+        nonlocal ponder_search, ponder_move
+        if ponder_search is None or ponder_move is not None or not ponder_search.done():
+            return
+        predicted = ponder_search.result
+        ponder_board = board.copy()
+        if predicted:
+            ponder_board.push(predicted)
+        if not predicted or ponder_board.is_game_over():
+            ponder_search = None
+            return
+        print(f"Pondering on {predicted.uci()}...")
+        ponder_move = predicted
+        ponder_search = best_move_async(ponder_board, max_time=ponder_time_limit, max_depth=max_depth_for_engine)
+
+    def finish_ponder():
+        """The human has moved: on a ponder hit return that search's handle, otherwise cancel it and return None."""
+        nonlocal ponder_search, ponder_move
+        search, predicted = ponder_search, ponder_move
+        ponder_search = ponder_move = None
+        if search is None:
+            return None
+        if predicted and len(board.move_stack) == ponder_ply + 1 and board.peek() == predicted:
+            print("Ponder hit.")
+            root.after(int(move_time_for_engine * 1000), search.cancel)
+            return search
+        print("Ponder miss.")
+        search.cancel()  # The engine runs searches in order, so the real one starts once this unwinds
+        return None
 
     def computer_turn():
         nonlocal move_number, last_move_stack_size
@@ -42,12 +90,15 @@ def human_vs_computer(best_move_async, board, human_color=chess.WHITE, gui=None,
 
         if legal_move_count == 0 or piece_count <= 2 or is_game_over:
             print("Game loop stopping.")
+            if ponder_search:
+                ponder_search.cancel()
             return
 
         current_move_stack_size = len(board.move_stack)
         if current_move_stack_size > last_move_stack_size and board.turn == human_color:
             last_move_stack_size = current_move_stack_size
             print("Human move detected, waiting for next turn...")
+            update_ponder()
             root.after(100, computer_turn)
             return
 
@@ -57,15 +108,18 @@ def human_vs_computer(best_move_async, board, human_color=chess.WHITE, gui=None,
             print(f"{computer_player} to play (computer)...")
             if gui:
                 gui.moves_text.insert(tk.END, "Computer thinking...\n")
-            result_queue = best_move_async(board, max_time=move_time_for_engine, max_depth=max_depth_for_engine)
-            root.after(100, lambda: check_computer_move(result_queue, move_number))
+            search = finish_ponder() if ponder else None
+            if search is None:
+                search = best_move_async(board, max_time=move_time_for_engine, max_depth=max_depth_for_engine)
+            root.after(100, lambda: check_computer_move(search, move_number))
         else:
+            update_ponder()
             root.after(100, computer_turn)  # Wait for human move
 
-    def check_computer_move(result_queue, move_num):
+    def check_computer_move(search, move_num):
         nonlocal last_move_stack_size
-        if not result_queue.empty():
-            move = result_queue.get()
+        if search.done():
+            move = search.result
             computer_player = "Black" if human_color else "White"
             print(f"Async result for {computer_player}: {move.uci() if move else 'None'}")
             if move and move in board.legal_moves:
@@ -76,13 +130,15 @@ def human_vs_computer(best_move_async, board, human_color=chess.WHITE, gui=None,
                 if gui:
                     gui.make_move(move)
                 last_move_stack_size = len(board.move_stack)
+                if ponder and not board.is_game_over():
+                    start_ponder()
                 root.after(100, computer_turn)
             else:
                 print(f"Invalid move from engine: {move.uci() if move else 'None'} in {board.fen()}")
                 root.after(100, computer_turn)  # Retry or continue
         else:
             # print("Waiting for computer move...")
-            root.after(100, lambda: check_computer_move(result_queue, move_num))
+            root.after(100, lambda: check_computer_move(search, move_num))
 
     if root:
         root.after(100, computer_turn)
\ No newline at end of file
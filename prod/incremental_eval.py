@@ -0,0 +1,162 @@
+from collections import namedtuple
+
+import chess
+
+from prod.fast_board import SearchBoard
+from prod.zobrist import ZobristBoard, piece_index
+
+# Game phase weight per piece type; 24 is the full opening phase
+phase_weights = {chess.PAWN: 0, chess.KNIGHT: 1, chess.BISHOP: 1,
+                 chess.ROOK: 2, chess.QUEEN: 4, chess.KING: 0}
+max_phase = 24
+
+# mg/eg: signed material + PST values indexed piece_index * 64 + square
+# (White positive, Black negative); phase: weight per piece_index
+EvalTables = namedtuple('EvalTables', ['mg', 'eg', 'phase'])
+
+
+def build_eval_tables(piece_values, mg_pst, eg_pst=None, back_rank_penalty=None):
+    """Fold material, PSTs and per-square penalties into flat lookup tables.
+
+    Black reads the tables at 63 - square, like the engines always have.
+    back_rank_penalty maps piece types to a penalty for sitting on the home rank.
+    """
+    eg_pst = eg_pst or {}
+    back_rank_penalty = back_rank_penalty or {}
+    mg = [0] * (12 * 64)
+    eg = [0] * (12 * 64)
+    phase = [0] * 12
+    for color in chess.COLORS:
+        sign = 1 if color == chess.WHITE else -1
+        home_rank = 0 if color == chess.WHITE else 7
+        for piece_type in chess.PIECE_TYPES:
+            index = piece_index(piece_type, color)
+            phase[index] = phase_weights[piece_type]
+            for square in chess.SQUARES:
+                pst_square = square if color == chess.WHITE else 63 - square
+                base = piece_values.get(piece_type, 0)
+                if chess.square_rank(square) == home_rank:
+                    base -= back_rank_penalty.get(piece_type, 0)
+                mg_value = base + mg_pst.get(piece_type, [0] * 64)[pst_square]
+                eg_value = base + eg_pst.get(piece_type, mg_pst.get(piece_type, [0] * 64))[pst_square]
+                mg[index * 64 + square] = sign * mg_value
+                eg[index * 64 + square] = sign * eg_value
+    return EvalTables(mg, eg, phase)
+
+
+def taper(mg, eg, phase):
+    phase = min(phase, max_phase)
+    return (mg * phase + eg * (max_phase - phase)) // max_phase
+
+
+def full_sums(board, tables):
+    mg = eg = phase = 0
+    for square, piece in board.piece_map().items():
+        index = piece_index(piece.piece_type, piece.color)
+        mg += tables.mg[index * 64 + square]
+        eg += tables.eg[index * 64 + square]
+        phase += tables.phase[index]
+    return mg, eg, phase
+
+
+def material_and_pst(board, tables):
+    """Tapered material + PST score from White's point of view.
+
+    O(1) for an EvalBoard or EvalSearchBoard built with the same tables, a
+    full scan otherwise.
+    """
+    if isinstance(board, (EvalBoard, EvalSearchBoard)) and board.eval_tables is tables:
+        return taper(board.eval_mg, board.eval_eg, board.phase)
+    return taper(*full_sums(board, tables))
+
+
+class EvalBoard(ZobristBoard):
+    """ZobristBoard that also keeps material + PST sums and the game phase up to date on push/pop."""
+
+    def __init__(self, fen=chess.STARTING_FEN, *, chess960=False, eval_tables=None):
+        self.eval_tables = eval_tables
+        super().__init__(fen, chess960=chess960)
+
+    def copy(self, *, stack=True):
+        board = super().copy(stack=stack)
+        board.eval_tables = self.eval_tables
+        board.eval_mg, board.eval_eg, board.phase = self.eval_mg, self.eval_eg, self.phase
+        return board
+
+    def root(self):
+        board = super().root()
+        if board.eval_tables is not self.eval_tables:
+            board.eval_tables = self.eval_tables
+            board._recompute_state()
+        return board
+
+    def _recompute_state(self):
+        super()._recompute_state()
+        if self.eval_tables:
+            self.eval_mg, self.eval_eg, self.phase = full_sums(self, self.eval_tables)
+        else:
+            self.eval_mg = self.eval_eg = self.phase = 0
+
+    def _save_state(self):
+        return self.zobrist_key, self.pawn_key, self.eval_mg, self.eval_eg, self.phase
+
+    def _restore_state(self, state):
+        self.zobrist_key, self.pawn_key, self.eval_mg, self.eval_eg, self.phase = state
+
+    def _update_square(self, square, old_index, new_index):
+        super()._update_square(square, old_index, new_index)
+        tables = self.eval_tables
+        if not tables:
+            return
+        if old_index >= 0:
+            self.eval_mg -= tables.mg[old_index * 64 + square]
+            self.eval_eg -= tables.eg[old_index * 64 + square]
+            self.phase -= tables.phase[old_index]
+        if new_index >= 0:
+            self.eval_mg += tables.mg[new_index * 64 + square]
+            self.eval_eg += tables.eg[new_index * 64 + square]
+            self.phase += tables.phase[new_index]
+
+
+class EvalSearchBoard(SearchBoard):
+    """SearchBoard that also keeps material + PST sums and the game phase up to date on make/unmake.
+
+    Pieces are indexed like zobrist.piece_index, so the tables of
+    build_eval_tables apply unchanged.
+    """
+
+    __slots__ = ('eval_tables', 'eval_mg', 'eval_eg', 'phase')
+
+    def __init__(self, eval_tables=None):
+        self.eval_tables = eval_tables
+        self.eval_mg = self.eval_eg = self.phase = 0
+        super().__init__()
+
+    def copy(self):
+        board = super().copy()
+        board.eval_tables = self.eval_tables
+        board.eval_mg, board.eval_eg, board.phase = self.eval_mg, self.eval_eg, self.phase
+        return board
+
+    def _put(self, square, index):
+        super()._put(square, index)
+        tables = self.eval_tables
+        if tables:
+            self.eval_mg += tables.mg[index * 64 + square]
+            self.eval_eg += tables.eg[index * 64 + square]
+            self.phase += tables.phase[index]
+
+    def _remove(self, square, index):
+        super()._remove(square, index)
+        tables = self.eval_tables
+        if tables:
+            self.eval_mg -= tables.mg[index * 64 + square]
+            self.eval_eg -= tables.eg[index * 64 + square]
+            self.phase -= tables.phase[index]
+
+    def _move_piece(self, from_square, to_square, index):
+        super()._move_piece(from_square, to_square, index)
+        tables = self.eval_tables
+        if tables:
+            self.eval_mg += tables.mg[index * 64 + to_square] - tables.mg[index * 64 + from_square]
+            self.eval_eg += tables.eg[index * 64 + to_square] - tables.eg[index * 64 + from_square]
@@ -0,0 +1,100 @@
+import importlib
+import multiprocessing as mp
+import time
+
+import chess
+
+from prod.transposition_table import TranspositionTable
+
+
+def _helper_main(engine_name, shm_name, size_mb, jobs, stop_event, helper_id):
+    """Helper process loop: attach to the shared table and search every submitted root."""
+    engine = importlib.import_module(engine_name)
+    engine.transposition_table = TranspositionTable(size_mb, shm_name=shm_name)
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            root_fen, moves, max_time, max_depth, age = job
+            board = chess.Board(root_fen)
+            for uci in moves:
+                board.push_uci(uci)
+            engine.transposition_table.age = age
+            engine.helper_search(board, max_time, max_depth, helper_id, stop_event)
+    finally:
+        engine.transposition_table.close()
+
+
+class LazySMP:
+    """Helper processes that search the same root as the caller through a shared transposition table.
+
+    The caller runs the main search itself and reads the result; helpers only
+    fill the table. engine_name must name a module with a module-level
+    transposition_table and a helper_search(board, max_time, max_depth,
+    helper_id, stop_event) function. Helpers stay alive between searches.
+    """
+
+    def __init__(self, engine_name, helpers, size_mb):
+        self.helpers = helpers
+        self.table = TranspositionTable(size_mb, shared=True)
+        self.stop_event = mp.Event()
+        self.jobs = [mp.Queue() for _ in range(helpers)]
+        self.processes = [
+            mp.Process(target=_helper_main,
+                       args=(engine_name, self.table.shm_name, size_mb, self.jobs[i], self.stop_event, i + 1),
+                       daemon=True)
+            for i in range(helpers)
+        ]
+        for process in self.processes:
+            process.start()
+
+    def start_search(self, board, max_time, max_depth):
+        """Send the position (root FEN plus moves) to every helper."""
+        self.stop_event.clear()
+        job = (board.root().fen(), [move.uci() for move in board.move_stack], max_time, max_depth, self.table.age)
+        for jobs in self.jobs:
+            jobs.put(job)
+
+    def stop_search(self):
+        self.stop_event.set()
+
+    def close(self):
+        self.stop_event.set()
+        for jobs in self.jobs:
+            jobs.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.table.close()
+
+
+def time_to_depth_report(depth=5, worker_counts=(1, 2, 4, 8), fens=None):
+    """Time engine_third to a fixed depth with 1/2/4/8 workers and print the speedup."""
+    from prod import engine_third
+
+    fens = fens or [chess.STARTING_FEN,
+                    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                    "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 8"]
+    timings = {}
+    for workers in worker_counts:
+        total = 0.0
+        for fen in fens:
+            engine_third.transposition_table.clear()
+            start = time.time()
+            engine_third.get_best_move_with_time_limitation(chess.Board(fen), max_time=10 ** 6, max_depth=depth,
+                                                            workers=workers)
+            total += time.time() - start
+        timings[workers] = total
+
+    print(f"\nTime to depth {depth} over {len(fens)} positions")
+    print("workers\ttime (s)\tspeedup")
+    for workers, total in timings.items():
+        print(f"{workers}\t{total:.2f}\t\t{timings[worker_counts[0]] / total:.2f}x")
+    engine_third.close_smp_pool()
+    return timings
+
+
+if __name__ == "__main__":
+    time_to_depth_report()
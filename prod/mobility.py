@@ -0,0 +1,33 @@
+import chess
+
+
+def mobility(board, color):
+    """Move count for *color* from attack bitboards, without generating moves.
+
+    Pieces count the squares they attack that are not their own; pawns count
+    single pushes onto empty squares. Pins, checks, castling, double pushes
+    and pawn captures are ignored.
+    """
+    own = board.occupied_co[color]
+    count = 0
+    for square in chess.scan_forward(own & ~board.pawns):
+        count += chess.popcount(board.attacks_mask(square) & ~own)
+    pawns = board.pawns & own
+    pushes = pawns << 8 if color == chess.WHITE else pawns >> 8
+    return count + chess.popcount(pushes & ~board.occupied & chess.BB_ALL)
+
+
+def promotable_pawns(board, color):
+    """Pawns of *color* on their 7th rank that can promote next move, by pushing or capturing."""
+    own = board.occupied_co[color]
+    if color == chess.WHITE:
+        pawns = board.pawns & own & chess.BB_RANK_7
+        pushable = (pawns << 8) & ~board.occupied
+        targets = board.occupied_co[chess.BLACK] & chess.BB_RANK_8
+        capture_sources = ((targets >> 7) & ~chess.BB_FILE_A) | ((targets >> 9) & ~chess.BB_FILE_H)
+        return chess.popcount((pushable >> 8) | (pawns & capture_sources))
+    pawns = board.pawns & own & chess.BB_RANK_2
+    pushable = (pawns >> 8) & ~board.occupied
+    targets = board.occupied_co[chess.WHITE] & chess.BB_RANK_1
+    capture_sources = ((targets << 7) & ~chess.BB_FILE_H) | ((targets << 9) & ~chess.BB_FILE_A)
+    return chess.popcount((pushable << 8) | (pawns & capture_sources))
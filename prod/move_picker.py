@@ -0,0 +1,103 @@
+import chess
+
+from prod.fast_board import EMPTY
+from prod.see import check_squares, check_squares_int, gives_direct_check, gives_direct_check_int, see, see_int
+
+
+def staged_moves(board, hash_move=None, killers=(), history=None):
+    """Yield legal moves one stage at a time, generating each stage only when reached.
+
+    Order: hash move, winning/equal captures and queen promotions (by SEE),
+    killer moves, quiet moves (direct checks first, then by history score),
+    losing captures. history is indexed from_square * 64 + to_square for
+    the side to move. A cutoff in an early stage skips quiet move generation.
+    """
+    yielded = []
+    if hash_move and board.is_legal(hash_move):
+        yielded.append(hash_move)
+        yield hash_move
+
+    # Captures and queen promotions
+    tactical = list(board.generate_legal_captures())
+    promotion_squares = chess.BB_RANK_8 if board.turn == chess.WHITE else chess.BB_RANK_1
+    tactical.extend(move for move in board.generate_legal_moves(board.pawns, promotion_squares & ~board.occupied)
+                    if move.promotion == chess.QUEEN)
+    scored = sorted(((see(board, move), move) for move in tactical if move != hash_move),
+                    key=lambda item: item[0], reverse=True)
+    bad_captures = []
+    for exchange, move in scored:
+        if exchange < 0:
+            bad_captures.append(move)
+        else:
+            yield move
+
+    for killer in killers:
+        if (killer and killer not in yielded and not board.is_capture(killer)
+                and killer.promotion != chess.QUEEN and board.is_legal(killer)):
+            yielded.append(killer)
+            yield killer
+
+    # Quiet moves: everything that does not land on an enemy piece
+    checks = check_squares(board)
+    quiets = [move for move in board.generate_legal_moves(chess.BB_ALL, ~board.occupied_co[not board.turn])
+              if move.promotion != chess.QUEEN and not board.is_en_passant(move) and move not in yielded]
+    if history is None:
+        quiets.sort(key=lambda move: gives_direct_check(board, move, checks), reverse=True)
+    else:
+        quiets.sort(key=lambda move: (gives_direct_check(board, move, checks),
+                                      history[move.from_square * 64 + move.to_square]), reverse=True)
+    yield from quiets
+
+    yield from bad_captures
+
+
+def staged_moves_int(board, hash_move=None, killers=(), history=None):
+    """staged_moves() for a SearchBoard and int moves, in the same order.
+
+    SearchBoard generates every legal move at once, so the stages split that
+    list; the SEE scoring and the quiet move sort are still only done when
+    their stage is reached.
+    """
+    moves = board.legal_moves()
+    if hash_move and hash_move in moves:
+        yield hash_move
+
+    mailbox = board.mailbox
+    ep_square = board.ep_square
+    tactical = []
+    quiets = []
+    for move in moves:
+        if move == hash_move:
+            continue
+        to_square = move >> 6 & 63
+        if (mailbox[to_square] != EMPTY or move >> 12 == chess.QUEEN
+                or (to_square == ep_square and mailbox[move & 63] % 6 == chess.PAWN - 1)):
+            tactical.append(move)
+        else:
+            quiets.append(move)
+
+    scored = sorted(((see_int(board, move), move) for move in tactical), key=lambda item: item[0], reverse=True)
+    bad_captures = []
+    for exchange, move in scored:
+        if exchange < 0:
+            bad_captures.append(move)
+        else:
+            yield move
+
+    yielded = []
+    for killer in killers:
+        if killer and killer != hash_move and killer not in yielded and killer in quiets:
+            yielded.append(killer)
+            yield killer
+
+    checks = check_squares_int(board)
+    if yielded:
+        quiets = [move for move in quiets if move not in yielded]
+    if history is None:
+        quiets.sort(key=lambda move: gives_direct_check_int(board, move, checks), reverse=True)
+    else:
+        quiets.sort(key=lambda move: (gives_direct_check_int(board, move, checks),
+                                      history[(move & 63) * 64 + (move >> 6 & 63)]), reverse=True)
+    yield from quiets
+
+    yield from bad_captures
@@ -0,0 +1,72 @@
+import os
+import random
+
+import chess.polyglot
+
+from prod.constants import opening_book_path, opening_book_selection
+
+# Set to a Polyglot .bin file to use it; overrides constants.opening_book_path
+book_env_var = "CHESS_BOOK"
+
+SELECTIONS = ("weighted", "best")
+
+
+class OpeningBook:
+    """A Polyglot opening book.
+
+    chess.polyglot's reader memory-maps the file and binary-searches the
+    sorted entries by the position's Polyglot key, so a probe touches only a
+    few pages and opening the book costs nothing up front.
+    """
+
+    def __init__(self, path, selection=opening_book_selection, seed=None):
+        if selection not in SELECTIONS:
+            raise ValueError(f"Unknown book selection {selection!r}, expected one of {SELECTIONS}")
+        self.path = path
+        self.selection = selection
+        self.random = random.Random(seed)
+        self.reader = chess.polyglot.open_reader(path)
+
+    def probe(self, board):
+        """A book move for *board*, or None when the position is not in the book.
+
+        "weighted" picks among the entries in proportion to their weights,
+        "best" always plays the highest-weighted one.
+        """
+        try:
+            if self.selection == "best":
+                entry = self.reader.find(board)
+            else:
+                entry = self.reader.weighted_choice(board, random=self.random)
+        except IndexError:
+            return None
+        return entry.move if entry.move in board.legal_moves else None
+
+    def close(self):
+        self.reader.close()
+
+
+book = None
+
+
+def set_book(path, selection=opening_book_selection, seed=None):
+    """Use the book at *path* for every engine from now on; None turns the book off."""
+    global book
+    if book is not None and book.path == path and book.selection == selection:
+        return book
+    if book is not None:
+        book.close()
+        book = None
+    if path:
+        book = OpeningBook(path, selection, seed)
+    return book
+
+
+def book_move(board):
+    """The configured book's move for *board*, or None (also when no book is set)."""
+    if book is None:
+        return None
+    return book.probe(board)
+
+
+set_book(os.environ.get(book_env_var) or opening_book_path)
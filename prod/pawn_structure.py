@@ -0,0 +1,79 @@
+import chess
+
+from prod.fast_board import SearchBoard
+from prod.zobrist import ZobristBoard, pawn_zobrist_hash
+
+doubled_penalty = 10
+isolated_penalty = 10
+supported_bonus = 10
+passed_bonus = 20
+# Pawns one step from promoting (7th rank for White, 2nd for Black)
+advanced_bonus = 30
+
+# Files either side of each file
+adjacent_file_masks = [(chess.BB_FILES[f - 1] if f > 0 else 0) | (chess.BB_FILES[f + 1] if f < 7 else 0)
+                       for f in range(8)]
+
+
+def _front_span(color, square):
+    """Squares strictly ahead of *square* on its own file, from *color*'s point of view."""
+    rank = chess.square_rank(square)
+    ranks = range(rank + 1, 8) if color == chess.WHITE else range(rank)
+    span = 0
+    for r in ranks:
+        span |= chess.BB_RANKS[r]
+    return span & chess.BB_FILES[chess.square_file(square)]
+
+
+def _shift_files(bb):
+    """*bb* spread onto the neighbouring files."""
+    return ((bb << 1) & ~chess.BB_FILE_A | (bb >> 1) & ~chess.BB_FILE_H) & chess.BB_ALL
+
+
+# passed_masks[color][square]: enemy pawns here stop a pawn from being passed
+passed_masks = [[0] * 64, [0] * 64]
+# support_masks[color][square]: own pawns here defend or stand beside the pawn
+support_masks = [[0] * 64, [0] * 64]
+for _color in chess.COLORS:
+    for _square in chess.SQUARES:
+        _span = _front_span(_color, _square)
+        passed_masks[_color][_square] = _span | _shift_files(_span)
+        support_masks[_color][_square] = (chess.BB_PAWN_ATTACKS[not _color][_square]
+                                          | _shift_files(chess.BB_SQUARES[_square]))
+
+
+def pawn_structure_score(white_pawns, black_pawns):
+    """Doubled, isolated, supported, passed and advanced pawn terms from White's point of view."""
+    score = 0
+    for color, own, enemy, advanced_rank in ((chess.WHITE, white_pawns, black_pawns, chess.BB_RANK_7),
+                                             (chess.BLACK, black_pawns, white_pawns, chess.BB_RANK_2)):
+        side = 0
+        passed = passed_masks[color]
+        support = support_masks[color]
+        for square in chess.scan_forward(own):
+            file = square & 7
+            if own & chess.BB_FILES[file] & ~chess.BB_SQUARES[square]:
+                side -= doubled_penalty
+            if not own & adjacent_file_masks[file]:
+                side -= isolated_penalty
+            elif own & support[square]:
+                side += supported_bonus
+            if not enemy & passed[square]:
+                side += passed_bonus
+        side += chess.popcount(own & advanced_rank) * advanced_bonus
+        score += side if color == chess.WHITE else -side
+    return score
+
+
+def evaluate_pawn_structure(board, cache=None):
+    """pawn_structure_score for *board*, looked up in *cache* (an EvalCache) by the pawn-only Zobrist key."""
+    white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+    black_pawns = board.pawns & board.occupied_co[chess.BLACK]
+    if cache is None:
+        return pawn_structure_score(white_pawns, black_pawns)
+    key = board.pawn_key if isinstance(board, (ZobristBoard, SearchBoard)) else pawn_zobrist_hash(board)
+    score = cache.probe(key)
+    if score is None:
+        score = pawn_structure_score(white_pawns, black_pawns)
+        cache.store(key, score)
+    return score
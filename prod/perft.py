@@ -0,0 +1,165 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import chess
+
+from prod.fast_board import SearchBoard
+
+# Reference positions with their known perft counts for depth 1, 2, 3, ...
+reference_positions = [
+    ("startpos", chess.STARTING_FEN,
+     [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+# Move generators perft can drive
+BOARDS = ("search", "chess")
+
+
+def make_board(fen, board_type="search"):
+    return SearchBoard.from_fen(fen) if board_type == "search" else chess.Board(fen)
+
+
+def perft(board, depth):
+    """Count the leaf nodes of the legal move tree to *depth* (SearchBoard or chess.Board)."""
+    if isinstance(board, SearchBoard):
+        return _perft_search(board, depth)
+    return _perft_chess(board, depth)
+
+
+def _perft_search(board, depth):
+    moves = board.legal_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        board.make(move)
+        nodes += _perft_search(board, depth - 1)
+        board.unmake()
+    return nodes
+
+
+def _perft_chess(board, depth):
+    if depth <= 1:
+        return board.legal_moves.count() if depth == 1 else 1
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += _perft_chess(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def _root_moves(board):
+    """Root moves as (uci, move) pairs for either board type."""
+    if isinstance(board, SearchBoard):
+        return [(SearchBoard.move_to_chess(move).uci(), move) for move in board.legal_moves()]
+    return [(move.uci(), move) for move in board.legal_moves]
+
+
+def _push(board, move):
+    if isinstance(board, SearchBoard):
+        board.make(move)
+    else:
+        board.push(move)
+
+
+def _pop(board):
+    if isinstance(board, SearchBoard):
+        board.unmake()
+    else:
+        board.pop()
+
+
+def _divide_task(fen, board_type, uci, depth):
+    """Pool task: perft below one root move."""
+    board = make_board(fen, board_type)
+    _push(board, dict(_root_moves(board))[uci])
+    return uci, perft(board, depth - 1)
+
+
+def divide(fen, depth, board_type="search", workers=1):
+    """Perft per root move, as {uci: nodes}; with workers > 1 the root moves are split across processes."""
+    board = make_board(fen, board_type)
+    if depth < 1:
+        return {}
+    moves = _root_moves(board)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_divide_task, [fen] * len(moves), [board_type] * len(moves),
+                               [uci for uci, _ in moves], [depth] * len(moves))
+            return dict(results)
+    counts = {}
+    for uci, move in moves:
+        _push(board, move)
+        counts[uci] = perft(board, depth - 1)
+        _pop(board)
+    return counts
+
+
+def count_nodes(fen, depth, board_type="search", workers=1):
+    if workers > 1 and depth > 0:
+        return sum(divide(fen, depth, board_type, workers).values())
+    return perft(make_board(fen, board_type), depth)
+
+
+def run_perft(fen, depth, board_type="search", workers=1, show_divide=False):
+    """Time a perft run and print the node count and nodes/sec; returns the node count."""
+    start = time.time()
+    if show_divide and depth > 0:
+        counts = divide(fen, depth, board_type, workers)
+        nodes = sum(counts.values())
+        for uci in sorted(counts):
+            print(f"{uci}: {counts[uci]}")
+    else:
+        nodes = count_nodes(fen, depth, board_type, workers)
+    elapsed = time.time() - start
+    print(f"depth {depth}: {nodes} nodes in {elapsed:.2f}s ({nodes / max(elapsed, 1e-9):,.0f} nodes/sec)")
+    return nodes
+
+
+def run_suite(max_depth=3, board_type="search", workers=1):
+    """Check every reference position up to max_depth; returns True if all counts match."""
+    ok = True
+    total_nodes = 0
+    start = time.time()
+    for name, fen, expected in reference_positions:
+        for depth, count in enumerate(expected[:max_depth], start=1):
+            nodes = count_nodes(fen, depth, board_type, workers)
+            total_nodes += nodes
+            status = "ok" if nodes == count else f"FAILED (expected {count})"
+            ok = ok and nodes == count
+            print(f"{name} depth {depth}: {nodes} {status}")
+    elapsed = time.time() - start
+    print(f"{'All passed' if ok else 'Some FAILED'}: {total_nodes} nodes in {elapsed:.2f}s "
+          f"({total_nodes / max(elapsed, 1e-9):,.0f} nodes/sec, {board_type} board)")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft move-generation counter and benchmark.")
+    parser.add_argument("--fen", default=chess.STARTING_FEN, help="position to count from")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--divide", action="store_true", help="print the count below each root move")
+    parser.add_argument("--workers", type=int, default=1, help="processes to split the root moves across")
+    parser.add_argument("--board", choices=BOARDS, default="search", help="move generator to use")
+    parser.add_argument("--suite", action="store_true", help="check the reference positions up to --depth")
+    args = parser.parse_args()
+
+    if args.suite:
+        raise SystemExit(0 if run_suite(args.depth, args.board, args.workers) else 1)
+    run_perft(args.fen, args.depth, args.board, args.workers, args.divide)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import cProfile
+import functools
+import glob
+import io
+import itertools
+import os
+import pstats
+import time
+
+from prod.constants import profile_dir, profile_top_functions
+
+# Set to a directory to profile every search into it; overrides constants.profile_dir
+profile_env_var = "CHESS_PROFILE"
+
+profile_output = os.environ.get(profile_env_var) or profile_dir
+_dump_numbers = itertools.count(1)
+
+
+def enable(directory):
+    """Profile every search from now on, dumping one .prof file per move into *directory*."""
+    global profile_output
+    profile_output = directory
+
+
+def disable():
+    global profile_output
+    profile_output = None
+
+
+def profiled(search, name=None):
+    """Wrap an engine's blocking search so each call is run under cProfile while profiling is enabled.
+
+    Each move dumps <name>-<pid>-<n>.prof into profile_output and prints the
+    functions with the most own time. With profiling off the search is called
+    directly.
+    """
+    label = (name or getattr(search, '__module__', 'engine')).rsplit('.', 1)[-1]
+
+    @functools.wraps(search)
+    def wrapper(*args, **kwargs):
+        directory = profile_output
+        if directory is None:
+            return search(*args, **kwargs)
+        profiler = cProfile.Profile()
+        start = time.time()
+        try:
+            return profiler.runcall(search, *args, **kwargs)
+        finally:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{label}-{os.getpid()}-{next(_dump_numbers):04d}.prof")
+            profiler.dump_stats(path)
+            print(f"Profiled {label} move in {time.time() - start:.2f}s -> {path}")
+            print(top_functions(pstats.Stats(profiler)))
+
+    return wrapper
+
+
+def top_functions(stats, count=profile_top_functions, sort='tottime'):
+    """The *count* hottest functions of a pstats.Stats as printable text."""
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats(sort).print_stats(count)
+    # Skip pstats' header down to the table
+    text = stream.getvalue()
+    start = text.find('   ncalls')
+    return text[start:].rstrip() if start >= 0 else text.rstrip()
+
+
+def summarize(directory, count=profile_top_functions, pattern="*.prof"):
+    """Merge every dump in *directory* and print the hottest functions by own and cumulative time."""
+    paths = sorted(glob.glob(os.path.join(directory, pattern)))
+    if not paths:
+        print(f"No profiles matching {pattern} in {directory}")
+        return None
+    stats = pstats.Stats(*paths)
+    print(f"{len(paths)} profiled moves, {stats.total_tt:.2f}s in total")
+    print("By own time:")
+    print(top_functions(stats, count, 'tottime'))
+    print("By cumulative time:")
+    print(top_functions(stats, count, 'cumulative'))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Summarize the per-move profiles written when {profile_env_var} "
+                                                 "is set.")
+    parser.add_argument("directory", nargs="?", default=profile_output, help="directory holding the .prof dumps")
+    parser.add_argument("--top", type=int, default=profile_top_functions, help="functions to list")
+    parser.add_argument("--engine", help="only merge dumps of this engine module, e.g. engine_third")
+    args = parser.parse_args()
+    if not args.directory:
+        parser.error(f"no directory given and {profile_env_var} is not set")
+    summarize(args.directory, args.top, f"{args.engine}-*.prof" if args.engine else "*.prof")
+
+
+if __name__ == "__main__":
+    main()
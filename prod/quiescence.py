@@ -0,0 +1,172 @@
+import chess
+
+from prod.fast_board import EMPTY
+from prod.search import INF, MATE
+from prod.see import see, see_int
+
+# Material gained by capturing (or promoting to) each piece type
+capture_values = {chess.PAWN: 100, chess.KNIGHT: 320, chess.BISHOP: 330,
+                  chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 0}
+# Margin on top of the material swing before a capture is considered hopeless
+delta_margin = 200
+
+
+def capture_gain(board, move):
+    """Material a capture or promotion wins before any recapture."""
+    if board.is_en_passant(move):
+        gain = capture_values[chess.PAWN]
+    else:
+        gain = capture_values.get(board.piece_type_at(move.to_square), 0)
+    if move.promotion:
+        gain += capture_values[move.promotion] - capture_values[chess.PAWN]
+    return gain
+
+
+def mvv_lva(board, move):
+    return capture_gain(board, move) * 10 - capture_values[board.piece_type_at(move.from_square)] // 100
+
+
+def tactical_moves(board):
+    """Legal captures plus queen promotions, most valuable victim / least valuable attacker first."""
+    moves = list(board.generate_legal_captures())
+    promotion_squares = chess.BB_RANK_8 if board.turn == chess.WHITE else chess.BB_RANK_1
+    moves.extend(move for move in board.generate_legal_moves(board.pawns, promotion_squares & ~board.occupied)
+                 if move.promotion == chess.QUEEN)
+    return sorted(moves, key=lambda move: mvv_lva(board, move), reverse=True)
+
+
+def quiescence(board, alpha, beta, evaluate, context):
+    """Resolve captures and promotions at the search horizon.
+
+    evaluate(board) must score from the side to move's point of view, like
+    negamax. context counts quiescence nodes and seldepth and may raise
+    SearchAborted from poll(). In check every evasion is searched and
+    standing pat is not allowed.
+    """
+    context.qnodes += 1
+    context.poll()
+    ply = len(board.move_stack) - context.root_ply
+    if ply > context.seldepth:
+        context.seldepth = ply
+
+    if board.is_check():
+        evasions = list(board.legal_moves)
+        if not evasions:
+            return -(MATE - ply)  # Checkmate
+        best_value = -INF
+        for move in evasions:
+            board.push(move)
+            value = -quiescence(board, -beta, -alpha, evaluate, context)
+            board.pop()
+            if value > best_value:
+                best_value = value
+                if value > alpha:
+                    alpha = value
+            if alpha >= beta:
+                break
+        return best_value
+
+    # Stand pat: the side to move can usually do at least as well as doing nothing
+    stand_pat = evaluate(board)
+    if stand_pat >= beta:
+        return stand_pat
+    if stand_pat > alpha:
+        alpha = stand_pat
+
+    best_value = stand_pat
+    for move in tactical_moves(board):
+        # Delta pruning: even winning the piece outright cannot reach alpha
+        if stand_pat + capture_gain(board, move) + delta_margin < alpha:
+            continue
+        # Static exchange pruning: skip captures that lose material
+        if not move.promotion and see(board, move) < 0:
+            continue
+        board.push(move)
+        value = -quiescence(board, -beta, -alpha, evaluate, context)
+        board.pop()
+        if value > best_value:
+            best_value = value
+            if value > alpha:
+                alpha = value
+        if alpha >= beta:
+            break
+    return best_value
+
+
+def capture_gain_int(board, move):
+    """capture_gain() for a SearchBoard and an int move."""
+    mailbox = board.mailbox
+    to_square = move >> 6 & 63
+    captured = mailbox[to_square]
+    if captured != EMPTY:
+        gain = capture_values[captured % 6 + 1]
+    elif to_square == board.ep_square and mailbox[move & 63] % 6 == chess.PAWN - 1:
+        gain = capture_values[chess.PAWN]
+    else:
+        gain = 0
+    promotion = move >> 12
+    if promotion:
+        gain += capture_values[promotion] - capture_values[chess.PAWN]
+    return gain
+
+
+def tactical_moves_int(board):
+    """tactical_moves() for a SearchBoard, as int moves."""
+    mailbox = board.mailbox
+    moves = [move for move in board.legal_moves()
+             if move >> 12 == chess.QUEEN or board.is_capture(move)]
+    return sorted(moves, key=lambda move: capture_gain_int(board, move) * 10
+                  - capture_values[mailbox[move & 63] % 6 + 1] // 100, reverse=True)
+
+
+def quiescence_int(board, alpha, beta, evaluate, context):
+    """quiescence() for a SearchBoard and int moves.
+
+    Checkmate is found here, so evaluate(board) need only score material
+    and position.
+    """
+    context.qnodes += 1
+    context.poll()
+    ply = len(board.undo) - context.root_ply
+    if ply > context.seldepth:
+        context.seldepth = ply
+
+    if board.is_check():
+        evasions = board.legal_moves()
+        if not evasions:
+            return -(MATE - ply)
+        best_value = -INF
+        for move in evasions:
+            board.make(move)
+            value = -quiescence_int(board, -beta, -alpha, evaluate, context)
+            board.unmake()
+            if value > best_value:
+                best_value = value
+                if value > alpha:
+                    alpha = value
+            if alpha >= beta:
+                break
+        return best_value
+
+    stand_pat = evaluate(board)
+    if stand_pat >= beta:
+        return stand_pat
+    if stand_pat > alpha:
+        alpha = stand_pat
+
+    best_value = stand_pat
+    for move in tactical_moves_int(board):
+        if stand_pat + capture_gain_int(board, move) + delta_margin < alpha:
+            continue
+        if not move >> 12 and see_int(board, move) < 0:
+            continue
+        board.make(move)
+        value = -quiescence_int(board, -beta, -alpha, evaluate, context)
+        board.unmake()
+        if value > best_value:
+            best_value = value
+            if value > alpha:
+                alpha = value
+        if alpha >= beta:
+            break
+    return best_value
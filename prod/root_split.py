@@ -0,0 +1,164 @@
+import importlib
+import multiprocessing as mp
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import chess
+
+from prod.fast_board import SearchBoard
+from prod.search import INF, SearchAborted
+
+_pool = None
+_pool_workers = 0
+# Best root score so far, from the root side to move's point of view; read by
+# every task as it starts so later root moves search with the tightest bound
+_shared_alpha = None
+# Set when a root search returns with tasks still running, so they abort
+_stop_event = None
+# Counts root searches; a task queued by an earlier one returns without searching
+_generation = None
+
+
+def _init_worker(shared_alpha, stop_event, generation):
+    global _shared_alpha, _stop_event, _generation
+    _shared_alpha = shared_alpha
+    _stop_event = stop_event
+    _generation = generation
+
+
+class _TaskStop:
+    """Stop flag for a task of root search *generation*: set by the shared event or once a newer search starts.
+
+    The next search clears the event, so a stale task cannot rely on it alone.
+    """
+
+    def __init__(self, generation):
+        self.generation = generation
+
+    def is_set(self):
+        return _stop_event.is_set() or _generation.value != self.generation
+
+
+def get_pool(workers):
+    """Persistent process pool, so process startup is paid once rather than per move."""
+    global _pool, _pool_workers, _shared_alpha, _stop_event, _generation
+    if _pool is None or _pool_workers != workers:
+        shutdown_pool()
+        _shared_alpha = mp.Value('i', -INF, lock=False)
+        _stop_event = mp.Event()
+        _generation = mp.Value('i', 0, lock=False)
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                    initargs=(_shared_alpha, _stop_event, _generation))
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown_pool():
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+        _pool_workers = 0
+
+
+def _search_move(engine_name, root_fen, moves, move, depth, alpha, beta, deadline, generation):
+    """Pool task: score one root move with the engine's negamax on its root_board().
+
+    *move* is in the engine's own move type. value is None if the deadline
+    passed, the root search stopped, or the task belongs to an earlier root
+    search.
+    """
+    engine = importlib.import_module(engine_name)
+    if generation != _generation.value:
+        return move, None, (0, 0, 0, 0, 0, 0, 0)
+    board = chess.Board(root_fen)
+    for uci in moves:
+        board.push_uci(uci)
+    board = engine.root_board(board)
+    engine.search_context.new_search(board)
+    engine.search_context.set_limits(deadline, _TaskStop(generation))
+
+    alpha = min(max(alpha, _shared_alpha.value), beta - 1)
+    board.push(move)
+    try:
+        value = -engine.negamax(board, depth - 1, -alpha - 1, -alpha)
+        if alpha < value < beta:
+            value = -engine.negamax(board, depth - 1, -beta, -alpha)
+    except SearchAborted:
+        value = None
+    return move, value, engine.search_context.counters()
+
+
+def root_split_search(engine_name, board, moves, depth, alpha, beta, negamax, deadline, stop_event=None, *, workers,
+                      context=None):
+    """Drop-in for search.search_root that spreads the root moves over a process pool.
+
+    The first (PV) move is searched here with the full window to establish a
+    bound; the remaining moves go to the pool as root FEN plus move list.
+    Results are merged as they arrive and every improvement of alpha is
+    published to the workers. Node and cutoff counts from the workers are added to context,
+    and stop_event, checked before the PV move and during the merge, ends the search early. Workers stop at the deadline,
+    and any still running when the merge returns are stopped through a
+    shared event.
+    """
+    if stop_event is not None and stop_event.is_set():
+        return -INF, None, False
+    best_move = moves[0]
+    root_length = len(board.move_stack)
+    board.push(best_move)
+    try:
+        best_value = -negamax(board, depth - 1, -beta, -alpha)
+    except SearchAborted:
+        while len(board.move_stack) > root_length:
+            board.pop()
+        return -INF, None, False
+    board.pop()
+    if best_value > alpha:
+        alpha = best_value
+    if alpha >= beta or len(moves) == 1:
+        return best_value, best_move, True
+    if time.time() >= deadline:
+        return best_value, best_move, False
+
+    pool = get_pool(workers)
+    _generation.value += 1
+    _stop_event.clear()
+    _shared_alpha.value = alpha
+    if isinstance(board, SearchBoard):
+        # Built at the search root, so it has no history to replay
+        root_fen, history = board.fen(), []
+    else:
+        root_fen, history = board.root().fen(), [move.uci() for move in board.move_stack]
+    pending = {pool.submit(_search_move, engine_name, root_fen, history, move, depth, alpha, beta,
+                           deadline, _generation.value)
+               for move in moves[1:]}
+    try:
+        while pending:
+            # Wake up regularly so a stop request does not wait for the deadline
+            done, pending = wait(pending, timeout=min(0.1, max(0.0, deadline - time.time())),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                if time.time() >= deadline or (stop_event is not None and stop_event.is_set()):
+                    return best_value, best_move, False
+                continue
+            for future in done:
+                move, value, counters = future.result()
+                if context:
+                    context.add_counters(counters)
+                if value is None:
+                    return best_value, best_move, False
+                if value > best_value:
+                    best_value = value
+                    best_move = move
+                    if value > alpha:
+                        alpha = value
+                        _shared_alpha.value = min(alpha, beta)
+            if alpha >= beta:
+                break
+    finally:
+        if pending:
+            # Stop the subtrees that are already running, not just the queued ones
+            _stop_event.set()
+        for future in pending:
+            future.cancel()
+    return best_value, best_move, True
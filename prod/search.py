@@ -0,0 +1,85 @@
+import time
+
+# Bounds for integer alpha-beta windows; larger than any evaluation
+INF = 1000000
+# Checkmate score: being mated *ply* plies from the root scores -(MATE - ply), so nearer mates score higher
+MATE = 100000
+# Scores at least this large are mates; no search reaches 1000 plies
+MATE_BOUND = MATE - 1000
+aspiration_window = 50
+
+
+class SearchAborted(Exception):
+    """Raised inside the tree when a search must stop; caught at the root."""
+
+
+def search_root(board, moves, depth, alpha, beta, negamax, deadline, stop_event=None):
+    """Principal variation search over the root moves.
+
+    negamax(board, depth, alpha, beta) must score from the side to move's
+    point of view. Returns (score, best_move, completed); completed is False
+    when the deadline passed or stop_event was set before every root move was
+    searched, or when negamax raised SearchAborted part way through a root
+    move. stop_event is checked before each root move, so a search stopped
+    before it starts returns at once even if no node would poll it.
+    """
+    best_value = -INF
+    best_move = None
+    root_length = len(board.move_stack)
+    for i, move in enumerate(moves):
+        if stop_event is not None and stop_event.is_set():
+            return best_value, best_move, False
+        board.push(move)
+        try:
+            if i == 0:
+                value = -negamax(board, depth - 1, -beta, -alpha)
+            else:
+                # Zero-window search; re-search with the full window if it beats alpha
+                value = -negamax(board, depth - 1, -alpha - 1, -alpha)
+                if alpha < value < beta:
+                    value = -negamax(board, depth - 1, -beta, -alpha)
+        except SearchAborted:
+            # The tree was left mid-line; take the board back to the root
+            while len(board.move_stack) > root_length:
+                board.pop()
+            return best_value, best_move, False
+        board.pop()
+
+        if value > best_value:
+            best_value = value
+            best_move = move
+            if value > alpha:
+                alpha = value
+        if alpha >= beta:
+            break
+        if time.time() >= deadline:
+            return best_value, best_move, False
+    return best_value, best_move, True
+
+
+def aspiration_search(board, moves, depth, previous_score, negamax, deadline, root_search=search_root,
+                      stop_event=None):
+    """Search the root in a narrow window around the previous iteration's score.
+
+    The window is widened on the failing side (doubling each time) until the
+    score falls inside it. root_search defaults to search_root and must take
+    the same arguments; returns the same tuple as search_root.
+    """
+    if previous_score is None:
+        return root_search(board, moves, depth, -INF, INF, negamax, deadline, stop_event)
+
+    window = aspiration_window
+    alpha = max(-INF, previous_score - window)
+    beta = min(INF, previous_score + window)
+    while True:
+        value, best_move, completed = root_search(board, moves, depth, alpha, beta, negamax, deadline, stop_event)
+        if not completed:
+            return value, best_move, completed
+        if value <= alpha and alpha > -INF:
+            window *= 2
+            alpha = max(-INF, value - window)
+        elif value >= beta and beta < INF:
+            window *= 2
+            beta = min(INF, value + window)
+        else:
+            return value, best_move, completed
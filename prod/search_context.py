@@ -0,0 +1,144 @@
+import time
+
+from prod.search import SearchAborted
+
+max_ply = 128
+# Nodes between stop-flag and clock checks, minus one (a mask)
+poll_mask = 63
+# History scores are halved once any of them passes this bound
+history_limit = 1 << 16
+
+
+class SearchContext:
+    """Per-search state: node and cutoff counters, killer moves per ply, history scores and stop limits.
+
+    Kept off chess.Board so it survives between moves and can be shared by
+    every node of a search.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.qnodes = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        # Deepest ply from the root reached, quiescence included
+        self.seldepth = 0
+        self.root_ply = 0
+        self.killers = [[None, None] for _ in range(max_ply)]
+        # history[color][from_square * 64 + to_square]
+        self.history = [[0] * 4096, [0] * 4096]
+        self.completed_depth = 0
+        self.hard_deadline = float('inf')
+        self.stop_event = None
+        self.max_nodes = None
+
+    def new_search(self, board):
+        """Reset counters and killers, and age history, before searching *board*."""
+        self.nodes = 0
+        self.qnodes = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.seldepth = 0
+        self.completed_depth = 0
+        self.root_ply = len(board.move_stack)
+        for slots in self.killers:
+            slots[0] = slots[1] = None
+        self.age_history()
+        self.hard_deadline = float('inf')
+        self.stop_event = None
+        self.max_nodes = None
+
+    def clear(self):
+        """Forget killers and history, as at the start of a new game."""
+        for slots in self.killers:
+            slots[0] = slots[1] = None
+        for table in self.history:
+            table[:] = [0] * 4096
+
+    def set_limits(self, hard_deadline, stop_event=None, max_nodes=None):
+        """Abort the search once time.time() passes hard_deadline, stop_event is set or max_nodes are searched."""
+        self.hard_deadline = hard_deadline
+        self.stop_event = stop_event
+        self.max_nodes = max_nodes
+
+    def poll(self):
+        """Called on every node; every poll_mask + 1 nodes check the limits and raise SearchAborted."""
+        searched = self.nodes + self.qnodes
+        if searched & poll_mask:
+            return
+        if time.time() >= self.hard_deadline or (self.stop_event is not None and self.stop_event.is_set()):
+            raise SearchAborted
+        if self.max_nodes is not None and searched >= self.max_nodes:
+            raise SearchAborted
+
+    def count_cutoff(self, move_index):
+        """Count a beta cutoff by the move_index-th move searched at a node."""
+        self.beta_cutoffs += 1
+        if move_index == 0:
+            self.first_move_cutoffs += 1
+
+    def counters(self):
+        """The node, TT and cutoff counters as a tuple, for merging with add_counters()."""
+        return (self.nodes, self.qnodes, self.tt_probes, self.tt_hits, self.beta_cutoffs, self.first_move_cutoffs,
+                self.seldepth)
+
+    def add_counters(self, counters):
+        """Add the counters() of a search done elsewhere, such as a root-split worker."""
+        nodes, qnodes, tt_probes, tt_hits, beta_cutoffs, first_move_cutoffs, seldepth = counters
+        self.nodes += nodes
+        self.qnodes += qnodes
+        self.tt_probes += tt_probes
+        self.tt_hits += tt_hits
+        self.beta_cutoffs += beta_cutoffs
+        self.first_move_cutoffs += first_move_cutoffs
+        self.seldepth = max(self.seldepth, seldepth)
+
+    def ply(self, board):
+        return len(board.move_stack) - self.root_ply
+
+    def killers_at(self, ply):
+        return self.killers[ply] if ply < max_ply else ()
+
+    def store_killer(self, ply, move):
+        if ply >= max_ply:
+            return
+        slots = self.killers[ply]
+        if slots[0] != move:
+            slots[1] = slots[0]
+            slots[0] = move
+
+    def update_history(self, color, move, depth, tried_quiets=()):
+        """Reward the quiet move that caused a cutoff and penalize the quiets tried before it.
+
+        Moves are SearchBoard int moves, from | to << 6 | promotion << 12.
+        """
+        table = self.history[color]
+        bonus = depth * depth
+        index = (move & 63) * 64 + (move >> 6 & 63)
+        table[index] += bonus
+        for quiet in tried_quiets:
+            table[(quiet & 63) * 64 + (quiet >> 6 & 63)] -= bonus
+        if table[index] > history_limit:
+            self.age_history()
+
+    def age_history(self):
+        for table in self.history:
+            for i, score in enumerate(table):
+                if score:
+                    table[i] = int(score / 2)
+
+    def history_for(self, board):
+        return self.history[board.turn]
+
+
+def is_quiet(board, move):
+    return not move.promotion and not board.is_capture(move)
+
+
+def is_quiet_int(board, move):
+    """is_quiet() for a SearchBoard and int moves."""
+    return not move >> 12 and not board.is_capture(move)
@@ -0,0 +1,90 @@
+class IterationStats:
+    """Counters for one completed iteration of iterative deepening.
+
+    Node, TT and cutoff counts are cumulative since the start of the search,
+    as UCI reports them; ebf compares this iteration's nodes with the last one's.
+    """
+
+    def __init__(self, depth, seldepth, score, nodes, qnodes, tt_probes, tt_hits, beta_cutoffs,
+                 first_move_cutoffs, elapsed, pv, ebf=None):
+        self.depth = depth
+        self.seldepth = seldepth
+        self.score = score
+        self.nodes = nodes
+        self.qnodes = qnodes
+        self.tt_probes = tt_probes
+        self.tt_hits = tt_hits
+        self.beta_cutoffs = beta_cutoffs
+        self.first_move_cutoffs = first_move_cutoffs
+        self.elapsed = elapsed
+        self.pv = pv
+        self.ebf = ebf
+
+    @property
+    def total_nodes(self):
+        return self.nodes + self.qnodes
+
+    @property
+    def nps(self):
+        return int(self.total_nodes / self.elapsed) if self.elapsed > 0 else 0
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def first_move_cutoff_rate(self):
+        """Share of beta cutoffs caused by the first move searched; high means good move ordering."""
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    def as_dict(self):
+        return {'depth': self.depth, 'seldepth': self.seldepth, 'score': self.score, 'nodes': self.nodes,
+                'qnodes': self.qnodes, 'tt_probes': self.tt_probes, 'tt_hits': self.tt_hits,
+                'beta_cutoffs': self.beta_cutoffs, 'first_move_cutoff_rate': round(self.first_move_cutoff_rate, 3),
+                'ebf': round(self.ebf, 2) if self.ebf else None, 'time': round(self.elapsed, 3), 'nps': self.nps,
+                'pv': [move.uci() for move in self.pv]}
+
+    def __str__(self):
+        ebf = f"{self.ebf:.2f}" if self.ebf else "-"
+        return (f"depth {self.depth} seldepth {self.seldepth} score {self.score} "
+                f"nodes {self.nodes} qnodes {self.qnodes} nps {self.nps} time {self.elapsed:.2f}s "
+                f"tt hits {self.tt_hit_rate:.0%} cutoffs {self.beta_cutoffs} "
+                f"first-move {self.first_move_cutoff_rate:.0%} ebf {ebf} "
+                f"pv {' '.join(move.uci() for move in self.pv)}")
+
+
+class SearchStats:
+    """IterationStats of one search, in depth order.
+
+    on_iteration(iteration_stats), if given, is called as each iteration
+    completes, on the searching thread.
+    """
+
+    def __init__(self, on_iteration=None):
+        self.iterations = []
+        self.on_iteration = on_iteration
+
+    @property
+    def last(self):
+        return self.iterations[-1] if self.iterations else None
+
+    def record(self, context, depth, score, pv, elapsed):
+        """Snapshot the SearchContext counters after *depth* completed; returns the new IterationStats."""
+        previous = self.last
+        total = context.nodes + context.qnodes
+        ebf = None
+        if previous and previous.total_nodes:
+            previous_total = previous.total_nodes
+            earlier_total = self.iterations[-2].total_nodes if len(self.iterations) > 1 else 0
+            if previous_total > earlier_total:
+                ebf = (total - previous_total) / (previous_total - earlier_total)
+        iteration = IterationStats(depth, context.seldepth, score, context.nodes, context.qnodes, context.tt_probes,
+                                   context.tt_hits, context.beta_cutoffs, context.first_move_cutoffs, elapsed,
+                                   list(pv), ebf)
+        self.iterations.append(iteration)
+        if self.on_iteration:
+            self.on_iteration(iteration)
+        return iteration
+
+    def as_dicts(self):
+        return [iteration.as_dict() for iteration in self.iterations]
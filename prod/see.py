@@ -0,0 +1,173 @@
+import chess
+
+from prod.fast_board import (BISHOP, BLACK_OFFSET, EMPTY, KING, KNIGHT, PAWN, QUEEN, ROOK, bishop_attacks,
+                             king_attacks, knight_attacks, pawn_attacks, rook_attacks, square_bbs)
+
+see_values = {chess.PAWN: 100, chess.KNIGHT: 320, chess.BISHOP: 330,
+              chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 20000}
+
+
+def _attackers(board, square, occupied):
+    """Pieces of both colors attacking *square* through the given occupancy."""
+    queens_and_rooks = board.queens | board.rooks
+    queens_and_bishops = board.queens | board.bishops
+    return ((chess.BB_KING_ATTACKS[square] & board.kings)
+            | (chess.BB_KNIGHT_ATTACKS[square] & board.knights)
+            | (chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied] & queens_and_rooks)
+            | (chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied] & queens_and_rooks)
+            | (chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied] & queens_and_bishops)
+            | (chess.BB_PAWN_ATTACKS[chess.BLACK][square] & board.pawns & board.occupied_co[chess.WHITE])
+            | (chess.BB_PAWN_ATTACKS[chess.WHITE][square] & board.pawns & board.occupied_co[chess.BLACK])
+            ) & occupied
+
+
+def see(board, move):
+    """Static exchange evaluation of *move* in centipawns for the side to move.
+
+    Plays out the whole capture sequence on the target square on bitboards,
+    each side always recapturing with its least valuable attacker and being
+    free to stop. X-ray attackers behind moved pieces join in; pins are ignored.
+    Quiet moves score the exchange that follows if the mover is attacked there.
+    """
+    from_square, to_square = move.from_square, move.to_square
+    occupied = board.occupied ^ chess.BB_SQUARES[from_square]
+
+    if board.is_en_passant(move):
+        gain = see_values[chess.PAWN]
+        occupied ^= chess.BB_SQUARES[to_square - 8 if board.turn == chess.WHITE else to_square + 8]
+    else:
+        gain = see_values.get(board.piece_type_at(to_square), 0)
+    on_square = board.piece_type_at(from_square)
+    if move.promotion:
+        gain += see_values[move.promotion] - see_values[chess.PAWN]
+        on_square = move.promotion
+
+    gains = [gain]
+    side = not board.turn
+    attackers = _attackers(board, to_square, occupied)
+    while True:
+        side_attackers = attackers & board.occupied_co[side]
+        if not side_attackers:
+            break
+        for piece_type in chess.PIECE_TYPES:
+            candidates = side_attackers & board.pieces_mask(piece_type, side)
+            if candidates:
+                break
+        if piece_type == chess.KING and attackers & board.occupied_co[not side]:
+            break  # The king cannot recapture onto a defended square
+        gains.append(see_values[on_square] - gains[-1])
+        occupied ^= chess.BB_SQUARES[chess.lsb(candidates)]
+        attackers = _attackers(board, to_square, occupied)  # Reveal x-rays
+        on_square = piece_type
+        side = not side
+
+    # Each side may stand pat instead of continuing the exchange
+    while len(gains) > 1:
+        last = gains.pop()
+        gains[-1] = -max(-gains[-1], last)
+    return gains[0]
+
+
+def check_squares(board):
+    """Squares from which each piece type of the side to move gives direct check.
+
+    Lets move ordering spot checking quiet moves without push/pop.
+    Discovered checks are not detected.
+    """
+    king = board.king(not board.turn)
+    if king is None:
+        return {}
+    occupied = board.occupied
+    diagonal = chess.BB_DIAG_ATTACKS[king][chess.BB_DIAG_MASKS[king] & occupied]
+    straight = (chess.BB_RANK_ATTACKS[king][chess.BB_RANK_MASKS[king] & occupied]
+                | chess.BB_FILE_ATTACKS[king][chess.BB_FILE_MASKS[king] & occupied])
+    return {
+        chess.PAWN: chess.BB_PAWN_ATTACKS[not board.turn][king],
+        chess.KNIGHT: chess.BB_KNIGHT_ATTACKS[king],
+        chess.BISHOP: diagonal,
+        chess.ROOK: straight,
+        chess.QUEEN: diagonal | straight,
+        chess.KING: 0,
+    }
+
+
+def gives_direct_check(board, move, squares):
+    piece_type = move.promotion or board.piece_type_at(move.from_square)
+    return bool(squares[piece_type] & chess.BB_SQUARES[move.to_square])
+
+
+# Int-move versions for prod.fast_board.SearchBoard, same rules as above
+
+def _search_board_attackers(board, square, occupied):
+    pieces = board.pieces
+    queens = pieces[QUEEN] | pieces[QUEEN + BLACK_OFFSET]
+    return ((king_attacks[square] & (pieces[KING] | pieces[KING + BLACK_OFFSET]))
+            | (knight_attacks[square] & (pieces[KNIGHT] | pieces[KNIGHT + BLACK_OFFSET]))
+            | (rook_attacks(square, occupied) & (pieces[ROOK] | pieces[ROOK + BLACK_OFFSET] | queens))
+            | (bishop_attacks(square, occupied) & (pieces[BISHOP] | pieces[BISHOP + BLACK_OFFSET] | queens))
+            | (pawn_attacks[chess.BLACK][square] & pieces[PAWN])
+            | (pawn_attacks[chess.WHITE][square] & pieces[PAWN + BLACK_OFFSET])
+            ) & occupied
+
+
+def see_int(board, move):
+    """see() for a SearchBoard and an int move."""
+    from_square, to_square, promotion = move & 63, move >> 6 & 63, move >> 12
+    mailbox = board.mailbox
+    occupied = board.occupied ^ square_bbs[from_square]
+    on_square = mailbox[from_square] % 6 + 1
+    captured = mailbox[to_square]
+
+    if captured != EMPTY:
+        gain = see_values[captured % 6 + 1]
+    elif on_square == chess.PAWN and to_square == board.ep_square:
+        gain = see_values[chess.PAWN]
+        occupied ^= square_bbs[to_square - 8 if board.turn == chess.WHITE else to_square + 8]
+    else:
+        gain = 0
+    if promotion:
+        gain += see_values[promotion] - see_values[chess.PAWN]
+        on_square = promotion
+
+    gains = [gain]
+    side = not board.turn
+    pieces = board.pieces
+    attackers = _search_board_attackers(board, to_square, occupied)
+    while True:
+        side_attackers = attackers & board.colors[side]
+        if not side_attackers:
+            break
+        offset = 0 if side else BLACK_OFFSET
+        for piece in range(6):
+            candidates = side_attackers & pieces[piece + offset]
+            if candidates:
+                break
+        if piece == KING and attackers & board.colors[not side]:
+            break
+        gains.append(see_values[on_square] - gains[-1])
+        occupied ^= candidates & -candidates
+        attackers = _search_board_attackers(board, to_square, occupied)
+        on_square = piece + 1
+        side = not side
+
+    while len(gains) > 1:
+        last = gains.pop()
+        gains[-1] = -max(-gains[-1], last)
+    return gains[0]
+
+
+def check_squares_int(board):
+    """check_squares() for a SearchBoard, as a list indexed by its piece numbers (PAWN..KING)."""
+    king = board.king_square(not board.turn)
+    if king is None:
+        return [0] * 6
+    occupied = board.occupied
+    diagonal = bishop_attacks(king, occupied)
+    straight = rook_attacks(king, occupied)
+    return [pawn_attacks[not board.turn][king], knight_attacks[king], diagonal, straight, diagonal | straight, 0]
+
+
+def gives_direct_check_int(board, move, squares):
+    promotion = move >> 12
+    piece = promotion - 1 if promotion else board.mailbox[move & 63] % 6
+    return bool(squares[piece] & square_bbs[move >> 6 & 63])
@@ -0,0 +1,89 @@
+import math
+
+# Added to every pentanomial count so the variance is defined before all outcomes have been seen
+pentanomial_prior = 1e-3
+
+
+def expected_score(elo):
+    """Expected score per game for an Elo difference, in the logistic model."""
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def _mle_with_mean(probabilities, scores, mean):
+    """The distribution over *scores* closest to *probabilities* (maximum likelihood) with the given mean.
+
+    It has the form p_i / (1 + lam * (score_i - mean)); lam is found by bisection.
+    """
+    low = -1 / (max(scores) - mean)
+    high = 1 / (mean - min(scores))
+    for _ in range(100):
+        lam = (low + high) / 2
+        drift = sum(p * (x - mean) / (1 + lam * (x - mean)) for p, x in zip(probabilities, scores))
+        if drift > 0:
+            low = lam
+        else:
+            high = lam
+    lam = (low + high) / 2
+    return [p / (1 + lam * (x - mean)) for p, x in zip(probabilities, scores)]
+
+
+class SPRT:
+    """Sequential probability ratio test of H0: elo = elo0 against H1: elo = elo1, over game pairs.
+
+    Games are counted in colour-swapped pairs, so each pair scores 0, 0.5, 1,
+    1.5 or 2 and the five counts form a pentanomial distribution, which
+    accounts for the correlation between the two games of a pair that share
+    an opening. The LLR compares the most likely pentanomial distributions
+    whose mean is the expected score under each hypothesis (the generalized
+    SPRT). The test stops once the LLR leaves [lower, upper]: below lower
+    accepts H0, above upper accepts H1.
+    """
+
+    def __init__(self, elo0=0.0, elo1=5.0, alpha=0.05, beta=0.05):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.alpha = alpha
+        self.beta = beta
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.pentanomial = [0] * 5
+        self.trajectory = []  # (pairs, llr) after every pair
+
+    @property
+    def pairs(self):
+        return sum(self.pentanomial)
+
+    def add_pair(self, pair_score):
+        """Count a pair scoring pair_score (0 to 2, in halves) for the tested side; returns status()."""
+        self.pentanomial[round(pair_score * 2)] += 1
+        self.trajectory.append((self.pairs, self.llr()))
+        return self.status()
+
+    def llr(self):
+        pairs = self.pairs
+        if not pairs:
+            return 0.0
+        counts = [count + pentanomial_prior for count in self.pentanomial]
+        total = sum(counts)
+        probabilities = [count / total for count in counts]
+        # Pair scores scaled to 0..1 so their mean is comparable with the per-game expected score
+        scores = [i / 4 for i in range(5)]
+        p0 = _mle_with_mean(probabilities, scores, expected_score(self.elo0))
+        p1 = _mle_with_mean(probabilities, scores, expected_score(self.elo1))
+        return pairs * sum(p * math.log(b / a) for p, a, b in zip(probabilities, p0, p1))
+
+    def status(self):
+        """'H0' or 'H1' once a bound is crossed, else None."""
+        llr = self.trajectory[-1][1] if self.trajectory else 0.0
+        if llr <= self.lower:
+            return "H0"
+        if llr >= self.upper:
+            return "H1"
+        return None
+
+    def summary(self):
+        llr = self.trajectory[-1][1] if self.trajectory else 0.0
+        status = {"H0": "H0 accepted", "H1": "H1 accepted", None: "running"}[self.status()]
+        return (f"SPRT elo0={self.elo0:g} elo1={self.elo1:g} alpha={self.alpha:g} beta={self.beta:g}: "
+                f"LLR {llr:.2f} ({self.lower:.2f}, {self.upper:.2f}) after {self.pairs} pairs "
+                f"{self.pentanomial}, {status}")
@@ -0,0 +1,300 @@
+import argparse
+import contextlib
+import importlib
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import chess
+import chess.pgn
+
+from prod import opening_book
+from prod.constants import max_depth_for_engine, move_time_for_engine
+from prod.sprt import SPRT
+
+# Players a tournament can use: engine modules by short name, plus "random"
+tournament_engines = {
+    "engine": "prod.engine",
+    "engine_second": "prod.engine_second",
+    "engine_third": "prod.engine_third",
+}
+# Short, balanced opening lines in UCI; each is played twice with colours swapped
+default_openings = [
+    "e2e4 e7e5 g1f3 b8c6 f1b5",
+    "e2e4 e7e5 g1f3 b8c6 f1c4",
+    "e2e4 c7c5 g1f3 d7d6",
+    "e2e4 c7c5 b1c3 b8c6",
+    "e2e4 e7e6 d2d4 d7d5",
+    "e2e4 c7c6 d2d4 d7d5",
+    "d2d4 d7d5 c2c4 e7e6",
+    "d2d4 d7d5 c2c4 c7c6",
+    "d2d4 g8f6 c2c4 g7g6",
+    "d2d4 g8f6 c2c4 e7e6 g1f3",
+    "c2c4 e7e5 b1c3",
+    "g1f3 d7d5 g2g3",
+    "e2e4 d7d5 e4d5 d8d5",
+    "d2d4 f7f5 g2g3",
+    "e2e4 g7g6 d2d4 f8g7",
+    "c2c4 c7c5 g1f3 g8f6",
+]
+# Games still running after this many plies are scored as draws
+max_game_plies = 300
+elo_confidence_z = 1.96  # 95%
+
+
+def load_openings(path):
+    """Opening positions from a file: one FEN, EPD or line of UCI moves per line; # starts a comment."""
+    openings = []
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                openings.append(line)
+    return openings
+
+
+def opening_board(opening):
+    """Board for an opening given as a FEN/EPD or as UCI moves from the start position."""
+    first = opening.split()[0]
+    if "/" in first:
+        try:
+            return chess.Board(opening)
+        except ValueError:
+            board = chess.Board()
+            board.set_epd(opening)
+            return board
+    board = chess.Board()
+    for uci in opening.split():
+        board.push_uci(uci)
+    return board
+
+
+def _engine_move(name, board, move_time, max_depth):
+    if name == "random":
+        return random.choice(list(board.legal_moves))
+    move = opening_book.book_move(board)
+    if move is not None:
+        return move
+    engine = importlib.import_module(tournament_engines[name])
+    return engine.get_best_move_with_time_limitation(board, max_time=move_time, max_depth=max_depth,
+                                                     root_workers=1)
+
+
+def play_game(task):
+    """Pool task: play one game and return its record; the engines' prints are discarded."""
+    start = time.time()
+    board = opening_board(task["opening"])
+    opening_plies = len(board.move_stack)
+    opening_book.set_book(task.get("book"))
+    for name in {task["white"], task["black"]}:
+        if name != "random":
+            importlib.import_module(tournament_engines[name]).new_game()
+
+    termination = None
+    result = None
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        while True:
+            outcome = board.outcome(claim_draw=True)
+            if outcome:
+                result, termination = outcome.result(), outcome.termination.name.lower()
+                break
+            if len(board.move_stack) - opening_plies >= max_game_plies:
+                result, termination = "1/2-1/2", "max_plies"
+                break
+            name = task["white"] if board.turn == chess.WHITE else task["black"]
+            move = _engine_move(name, board, task["move_time"], task["max_depth"])
+            if move is None or move not in board.legal_moves:
+                result, termination = ("0-1" if board.turn == chess.WHITE else "1-0"), "illegal_move"
+                break
+            board.push(move)
+
+    return dict(task, result=result, termination=termination, plies=len(board.move_stack) - opening_plies,
+                moves=[move.uci() for move in board.move_stack], fen=board.fen(), time=round(time.time() - start, 2))
+
+
+def game_pgn(record, event="Engine tournament"):
+    """PGN text for a play_game record."""
+    board = opening_board(record["opening"])
+    root = board.root()
+    if root.fen() != chess.STARTING_FEN:
+        game = chess.pgn.Game.from_board(root)
+    else:
+        game = chess.pgn.Game()
+    node = game
+    for uci in record["moves"]:
+        node = node.add_variation(chess.Move.from_uci(uci))
+    game.headers["Event"] = event
+    game.headers["Date"] = time.strftime("%Y.%m.%d")
+    game.headers["Round"] = str(record["game"] + 1)
+    game.headers["White"] = record["white"]
+    game.headers["Black"] = record["black"]
+    game.headers["Result"] = record["result"]
+    game.headers["Termination"] = record["termination"]
+    game.headers["Opening"] = record["opening"]
+    return str(game) + "\n\n"
+
+
+def score_for(record, player):
+    """1, 0.5 or 0 for *player* in a finished game record."""
+    if record["result"] == "1/2-1/2":
+        return 0.5
+    white_won = record["result"] == "1-0"
+    return 1.0 if white_won == (record["white"] == player) else 0.0
+
+
+def elo_estimate(wins, draws, losses, z=elo_confidence_z):
+    """Elo difference from a W/D/L count, with the half-width of its confidence interval (None when undefined)."""
+    games = wins + draws + losses
+    if not games:
+        return 0.0, None
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = z * math.sqrt(variance / games)
+
+    def elo(s):
+        if s <= 0.0 or s >= 1.0:
+            return math.copysign(math.inf, s - 0.5)
+        return -400 * math.log10(1 / s - 1)
+
+    if score in (0.0, 1.0):
+        return elo(score), None
+    return elo(score), (elo(min(score + margin, 1.0)) - elo(max(score - margin, 0.0))) / 2
+
+
+def make_tasks(player, opponent, games, openings, move_time, max_depth, book=None):
+    """Games in colour-swapped pairs: both players get White once from each opening."""
+    tasks = []
+    for game in range(games):
+        pair = game // 2
+        white, black = (player, opponent) if game % 2 == 0 else (opponent, player)
+        tasks.append({"game": game, "pair": pair, "opening": openings[pair % len(openings)],
+                      "white": white, "black": black, "move_time": move_time, "max_depth": max_depth,
+                      "book": book})
+    return tasks
+
+
+def summary_line(player, opponent, wins, draws, losses):
+    elo, margin = elo_estimate(wins, draws, losses)
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games if games else 0.0
+    error = f" +/- {margin:.1f}" if margin is not None else ""
+    return (f"{player} vs {opponent}: {games} games, +{wins} ={draws} -{losses} "
+            f"({score:.1%}), Elo {elo:+.1f}{error}")
+
+
+def run_tournament(player, opponent, games=20, concurrency=None, openings=None, move_time=move_time_for_engine,
+                   max_depth=max_depth_for_engine, pgn_path=None, jsonl_path=None, shuffle_openings=False,
+                   sprt=None, book=None):
+    """Play *games* games of player against opponent over a process pool, one game per worker.
+
+    Each finished game is appended to pgn_path and jsonl_path as it arrives.
+    With an SPRT, every completed pair is added to it and no new games start
+    once it accepts a hypothesis; games already running are still recorded.
+    With a Polyglot book, both engines play from it (weighted) while it has moves.
+    Returns the game records in game order plus the W/D/L totals from
+    player's point of view.
+    """
+    openings = list(openings or default_openings)
+    if shuffle_openings:
+        random.shuffle(openings)
+    tasks = make_tasks(player, opponent, games, openings, move_time, max_depth, book)
+    concurrency = concurrency or os.cpu_count() or 1
+    records = []
+    pair_scores = {}
+    wins = draws = losses = 0
+    start = time.time()
+
+    with contextlib.ExitStack() as stack:
+        pgn_file = stack.enter_context(open(pgn_path, "a")) if pgn_path else None
+        jsonl_file = stack.enter_context(open(jsonl_path, "a")) if jsonl_path else None
+        pool = stack.enter_context(ProcessPoolExecutor(max_workers=concurrency))
+        queued = iter(tasks)
+        pending = set()
+        stopped = False
+        while True:
+            # Keep only a couple of games per worker queued, so stopping early wastes little
+            while not stopped and len(pending) < 2 * concurrency:
+                task = next(queued, None)
+                if task is None:
+                    break
+                pending.add(pool.submit(play_game, task))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                record = future.result()
+                records.append(record)
+                score = score_for(record, player)
+                wins += score == 1.0
+                draws += score == 0.5
+                losses += score == 0.0
+                if pgn_file:
+                    pgn_file.write(game_pgn(record))
+                    pgn_file.flush()
+                if jsonl_file:
+                    jsonl_file.write(json.dumps(record) + "\n")
+                    jsonl_file.flush()
+                print(f"Game {record['game'] + 1}: {record['white']} - {record['black']} {record['result']} "
+                      f"({record['termination']}, {record['plies']} plies, {record['time']:.1f}s)")
+                print(summary_line(player, opponent, wins, draws, losses))
+
+                scores = pair_scores.setdefault(record["pair"], [])
+                scores.append(score)
+                if sprt and len(scores) == 2 and not stopped:
+                    sprt.add_pair(sum(scores))
+                    print(sprt.summary())
+                    if sprt.status():
+                        stopped = True
+                        for queued_future in pending:
+                            queued_future.cancel()
+            pending = {future for future in pending if not future.cancelled()}
+
+    print(f"Played {len(records)} games in {time.time() - start:.1f}s with {concurrency} workers")
+    records.sort(key=lambda record: record["game"])
+    return records, (wins, draws, losses)
+
+
+def main():
+    choices = sorted(tournament_engines) + ["random"]
+    parser = argparse.ArgumentParser(description="Headless engine match over a process pool.")
+    parser.add_argument("player", choices=choices)
+    parser.add_argument("opponent", choices=choices)
+    parser.add_argument("--games", type=int, default=20, help="games to play (pairs share an opening)")
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count(), help="games played at once")
+    parser.add_argument("--movetime", type=float, default=move_time_for_engine, help="seconds per move")
+    parser.add_argument("--depth", type=int, default=max_depth_for_engine)
+    parser.add_argument("--openings", help="file of FEN/EPD or UCI move lines (default: built-in suite)")
+    parser.add_argument("--shuffle", action="store_true", help="shuffle the opening order")
+    parser.add_argument("--pgn", help="append every game to this PGN file")
+    parser.add_argument("--jsonl", help="append a JSON record per game to this file")
+    parser.add_argument("--book", help="Polyglot .bin book the engines play from after the opening line")
+    parser.add_argument("--sprt", action="store_true", help="stop early on an SPRT decision; --games is the cap")
+    parser.add_argument("--elo0", type=float, default=0.0, help="SPRT null hypothesis, in Elo")
+    parser.add_argument("--elo1", type=float, default=5.0, help="SPRT alternative hypothesis, in Elo")
+    parser.add_argument("--alpha", type=float, default=0.05, help="SPRT false positive rate")
+    parser.add_argument("--beta", type=float, default=0.05, help="SPRT false negative rate")
+    parser.add_argument("--sprt-log", help="write the LLR trajectory as JSON to this file")
+    args = parser.parse_args()
+
+    openings = load_openings(args.openings) if args.openings else None
+    sprt = SPRT(args.elo0, args.elo1, args.alpha, args.beta) if args.sprt else None
+    _, (wins, draws, losses) = run_tournament(args.player, args.opponent, args.games, args.concurrency, openings,
+                                              args.movetime, args.depth, args.pgn, args.jsonl, args.shuffle, sprt,
+                                              args.book)
+    print("\n--- Final Statistics ---")
+    print(summary_line(args.player, args.opponent, wins, draws, losses))
+    if sprt:
+        print(sprt.summary())
+        print("LLR trajectory: " + " ".join(f"{pairs}:{llr:.2f}" for pairs, llr in sprt.trajectory))
+        if args.sprt_log:
+            with open(args.sprt_log, "w") as f:
+                json.dump({"elo0": sprt.elo0, "elo1": sprt.elo1, "alpha": sprt.alpha, "beta": sprt.beta,
+                           "lower": sprt.lower, "upper": sprt.upper, "pentanomial": sprt.pentanomial,
+                           "status": sprt.status(), "trajectory": sprt.trajectory}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
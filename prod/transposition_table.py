@@ -0,0 +1,161 @@
+from multiprocessing import shared_memory
+
+import chess
+
+from prod.eval_cache import slot_key_salt
+from prod.search import MATE_BOUND
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Two 64-bit words per slot: key ^ data, and data packed as
+# score + 2**31 (bits 0-31) | move (32-47) | depth + 128 (48-55) | flag (56-57) | age (58-63)
+ENTRY_BYTES = 16
+
+
+def encode_move(move):
+    """Pack a move into 16 bits: from | to << 6 | promotion << 12. 0 means no move."""
+    if not move:
+        return 0
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+
+def decode_move(code):
+    if not code:
+        return None
+    return chess.Move(code & 63, (code >> 6) & 63, (code >> 12) or None)
+
+
+def score_to_tt(score, ply):
+    """Mate scores count plies from the root; store them counted from the node at *ply* instead."""
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    """Undo score_to_tt for a probe at *ply*."""
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+class TranspositionTable:
+    """Fixed-size, Zobrist-keyed transposition table backed by a preallocated buffer.
+
+    Each slot is replaced when it is empty, holds the same position, was written
+    during an older search, or holds a shallower result than the new one.
+
+    With shared=True the buffer lives in multiprocessing.shared_memory so other
+    processes can attach to it by shm_name. Slots are stored XOR-ed with their
+    key, so a torn write from a concurrent writer reads back as a miss instead
+    of a wrong entry and no locking is needed. Keys are salted like EvalCache's,
+    so a zero key does not match an empty (all-zero) slot. Best moves are
+    SearchBoard int moves, which use the encode_move packing.
+    """
+
+    def __init__(self, size_mb=64, *, shared=False, shm_name=None):
+        entries = max(1, size_mb * 1024 * 1024 // ENTRY_BYTES)
+        self.size = 1 << (entries.bit_length() - 1)  # Power of two so we can mask
+        self.mask = self.size - 1
+        self.age = 0
+
+        nbytes = ENTRY_BYTES * self.size
+        self.shm = None
+        self._owner = False
+        if shm_name:
+            self.shm = shared_memory.SharedMemory(name=shm_name)
+            buffer = self.shm.buf
+        elif shared:
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._owner = True
+            buffer = self.shm.buf
+        else:
+            buffer = bytearray(nbytes)
+        self._view = memoryview(buffer)[:nbytes]
+        self.checks = self._view[:nbytes // 2].cast('Q')
+        self.data = self._view[nbytes // 2:].cast('Q')
+
+    @property
+    def shm_name(self):
+        return self.shm.name if self.shm else None
+
+    def new_search(self):
+        """Advance the age so entries from previous moves become replaceable."""
+        self.age = (self.age + 1) & 63
+
+    def clear(self):
+        self._view[:] = bytes(len(self._view))
+        self.age = 0
+
+    def probe(self, key):
+        """Return (score, depth, flag, move) for *key*, or None on a miss."""
+        key ^= slot_key_salt
+        index = key & self.mask
+        data = self.data[index]
+        if self.checks[index] ^ data != key:
+            return None
+        return ((data & 0xFFFFFFFF) - 0x80000000, ((data >> 48) & 0xFF) - 128,
+                (data >> 56) & 3, (data >> 32) & 0xFFFF or None)
+
+    def store(self, key, depth, score, flag, move=None):
+        key ^= slot_key_salt
+        index = key & self.mask
+        data = self.data[index]
+        if self.checks[index] ^ data == key:
+            move_code = move if move is not None else (data >> 32) & 0xFFFF  # Keep the old best move
+        else:
+            if data and data >> 58 == self.age and ((data >> 48) & 0xFF) - 128 > depth:
+                return
+            move_code = move or 0
+        data = ((int(score) + 0x80000000) & 0xFFFFFFFF
+                | move_code << 32
+                | (max(-128, min(127, depth)) + 128) << 48
+                | flag << 56
+                | self.age << 58)
+        self.data[index] = data
+        self.checks[index] = key ^ data
+
+    def principal_variation(self, board, first_move, max_length):
+        """first_move followed by the stored best moves, while they stay legal and the line does not repeat.
+
+        board is a SearchBoard and the moves are int moves; it is left as it was.
+        """
+        pv = [first_move]
+        board.push(first_move)
+        seen = {board.zobrist_key}
+        while len(pv) < max_length:
+            entry = self.probe(board.zobrist_key)
+            move = entry[3] if entry else None
+            if move is None or not board.is_legal(move):
+                break
+            board.push(move)
+            pv.append(move)
+            if board.zobrist_key in seen:
+                break
+            seen.add(board.zobrist_key)
+        for _ in pv:
+            board.pop()
+        return pv
+
+    def hashfull(self):
+        """Permille of the first 1000 slots written during the current search."""
+        sample = min(1000, self.size)
+        used = sum(1 for i in range(sample) if self.data[i] and self.data[i] >> 58 == self.age)
+        return used * 1000 // sample
+
+    def close(self):
+        """Release a shared buffer; the creating process also unlinks it."""
+        if not self.shm:
+            return
+        self.checks.release()
+        self.data.release()
+        self._view.release()
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+        self.shm = None
+
@@ -0,0 +1,288 @@
+import argparse
+import importlib
+import sys
+import threading
+
+import chess
+
+from prod import opening_book
+from prod.constants import eval_cache_size_mb, max_depth_for_engine, transposition_table_size_mb
+from prod.search import MATE, MATE_BOUND
+
+# Engines the front-end can drive, by the name given on the command line
+uci_engines = {
+    "engine": ("prod.engine", "Minimax"),
+    "engine_second": ("prod.engine_second", "Minimax Second"),
+    "engine_third": ("prod.engine_third", "Minimax mistral"),
+}
+# Moves assumed left in the game when the GUI sends no movestogo
+default_moves_to_go = 30
+# Time kept back per move for communication lag, in milliseconds
+move_overhead_ms = 50
+# Depth cap for searches limited only by stop, nodes or time
+unlimited_depth = 64
+# Longest an unbounded (infinite, ponder or nodes) search may run, in seconds
+unlimited_time = 24 * 60 * 60
+max_threads = 64
+
+
+def allocate_time(time_left_ms, increment_ms=0, moves_to_go=None):
+    """Seconds to spend on this move from the clock: an even share of the time left plus most of the increment."""
+    usable = max(0, time_left_ms - move_overhead_ms)
+    budget = usable / (moves_to_go or default_moves_to_go) + increment_ms * 0.8
+    return max(0.01, min(budget, usable * 0.5)) / 1000
+
+
+def parse_go(tokens):
+    """The go arguments as a dict of ints, plus True for the flags (infinite, ponder)."""
+    params = {}
+    i = 0
+    while i < len(tokens):
+        name = tokens[i]
+        if name in ("infinite", "ponder"):
+            params[name] = True
+        elif name == "searchmoves":
+            break  # Not supported; the rest of the line is moves
+        elif i + 1 < len(tokens):
+            try:
+                params[name] = int(tokens[i + 1])
+            except ValueError:
+                pass
+            i += 1
+        i += 1
+    return params
+
+
+def score_text(iteration):
+    """UCI score for an iteration: "cp N", or "mate N" in moves (negative when mated).
+
+    Mate scores are MATE minus the plies to mate, so N follows from the score.
+    """
+    score = iteration.score
+    if abs(score) < MATE_BOUND:
+        return f"cp {score}"
+    moves = (MATE - abs(score) + 1) // 2
+    return f"mate {moves if score > 0 else -moves}"
+
+
+def info_line(iteration, hashfull=None):
+    """UCI info line for an IterationStats; hashfull (permille) is added when known."""
+    pv = " ".join(move.uci() for move in iteration.pv)
+    table = f" hashfull {hashfull}" if hashfull is not None else ""
+    return (f"info depth {iteration.depth} seldepth {iteration.seldepth} score {score_text(iteration)} "
+            f"nodes {iteration.total_nodes} nps {iteration.nps}{table} time {int(iteration.elapsed * 1000)} pv {pv}")
+
+
+class UciEngine:
+    """UCI protocol state for one engine module, driven through its engine_service.
+
+    Protocol output goes through send(); the engines' own prints should be
+    pointed elsewhere (main() sends them to stderr). Searches run on the
+    engine's worker thread, so stop and ponderhit are handled while it thinks.
+    In infinite and ponder mode bestmove is held back until stop or ponderhit,
+    as the protocol requires.
+    """
+
+    def __init__(self, engine_name, output=sys.stdout):
+        module_name, self.display_name = uci_engines[engine_name]
+        self.engine = importlib.import_module(module_name)
+        self.output = output
+        self.board = chess.Board()
+        self.threads = 1
+        self.search = None
+        self.reported = None  # Set once the current search's callback has run
+        self.hold = False  # Keep bestmove back (infinite or ponder)
+        self.held = None  # Search that finished while held
+        self.ponder_time = None  # Seconds to keep searching after ponderhit
+        self.timer = None
+        self._lock = threading.Lock()
+
+    def send(self, line):
+        with self._lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def handle(self, line):
+        """Process one command line; returns False on quit."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send(f"id name {self.display_name}")
+            self.send("id author amichay-doitch")
+            hash_mb = transposition_table_size_mb if hasattr(self.engine, "transposition_table") else eval_cache_size_mb
+            self.send(f"option name Hash type spin default {hash_mb} min 1 max 4096")
+            self.send(f"option name Threads type spin default 1 min 1 max {max_threads}")
+            self.send("option name Ponder type check default false")
+            self.send(f"option name OwnBook type check default {'true' if self.engine.engine_service.use_book else 'false'}")
+            book_path = opening_book.book.path if opening_book.book else "<empty>"
+            self.send(f"option name BookFile type string default {book_path}")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self.wait()
+            self.set_option(args)
+        elif command == "ucinewgame":
+            self.wait()
+            self.engine.new_game()
+            self.board = chess.Board()
+        elif command == "position":
+            self.wait()
+            self.set_position(args)
+        elif command == "go":
+            self.wait()
+            self.go(args)
+        elif command == "stop":
+            self.stop()
+        elif command == "ponderhit":
+            self.ponderhit()
+        elif command == "quit":
+            self.stop()
+            self.wait()
+            return False
+        return True
+
+    def set_option(self, args):
+        text = " ".join(args)
+        if not text.startswith("name ") or " value " not in text:
+            return
+        name, value = text[len("name "):].split(" value ", 1)
+        name = name.strip().lower()
+        try:
+            if name == "hash":
+                self.engine.set_hash_size(max(1, int(value)))
+            elif name == "threads":
+                self.threads = max(1, min(max_threads, int(value)))
+            elif name == "ownbook":
+                self.engine.engine_service.use_book = value.strip().lower() == "true"
+            elif name == "bookfile":
+                value = value.strip()
+                opening_book.set_book(None if value in ("", "<empty>") else value)
+        except (ValueError, OSError):
+            print(f"Bad value for option {name}: {value}")
+
+    def set_position(self, args):
+        if not args:
+            return
+        if args[0] == "startpos":
+            board, rest = chess.Board(), args[1:]
+        elif args[0] == "fen":
+            fen_end = args.index("moves") if "moves" in args else len(args)
+            board, rest = chess.Board(" ".join(args[1:fen_end])), args[fen_end:]
+        else:
+            return
+        if rest and rest[0] == "moves":
+            for uci in rest[1:]:
+                board.push_uci(uci)
+        self.board = board
+
+    def limits(self, params):
+        """Driver keyword arguments for the go parameters."""
+        limits = {"max_time": unlimited_time, "max_depth": params.get("depth", unlimited_depth)}
+        if "nodes" in params:
+            limits["max_nodes"] = params["nodes"]
+        if "movetime" in params:
+            limits["max_time"] = params["movetime"] / 1000
+        elif self.board.turn == chess.WHITE and "wtime" in params:
+            limits["max_time"] = allocate_time(params["wtime"], params.get("winc", 0), params.get("movestogo"))
+        elif self.board.turn == chess.BLACK and "btime" in params:
+            limits["max_time"] = allocate_time(params["btime"], params.get("binc", 0), params.get("movestogo"))
+        elif "depth" not in params and "nodes" not in params:
+            limits["max_depth"] = max_depth_for_engine  # Bare "go"
+        if self.threads > 1:
+            # Lazy-SMP helpers for the engine that has them, root splitting otherwise
+            limits["workers" if hasattr(self.engine, "get_smp_pool") else "root_workers"] = self.threads
+        return limits
+
+    def go(self, args):
+        params = parse_go(args)
+        limits = self.limits(params)
+        self.ponder_time = None
+        if params.get("ponder"):
+            # Think without a clock until ponderhit starts the real one
+            self.ponder_time = limits["max_time"]
+            limits["max_time"] = unlimited_time
+        with self._lock:
+            self.hold = bool(params.get("infinite") or params.get("ponder"))
+            self.held = None
+        reported = self.reported = threading.Event()
+
+        def finished(handle):
+            self._finished(handle)
+            reported.set()
+
+        self.search = self.engine.engine_service.submit(self.board, limits, finished,
+                                                        self._send_info)
+
+    def _send_info(self, iteration):
+        table = getattr(self.engine, "transposition_table", None)
+        self.send(info_line(iteration, table.hashfull() if table is not None else None))
+
+    def stop(self):
+        with self._lock:
+            self.hold = False
+            held, self.held = self.held, None
+        if self.search:
+            self.search.cancel()
+        if held:
+            self._send_bestmove(held)
+
+    def ponderhit(self):
+        with self._lock:
+            self.hold = False
+            held, self.held = self.held, None
+        if held:
+            self._send_bestmove(held)
+        elif self.search and self.ponder_time is not None:
+            self.timer = threading.Timer(self.ponder_time, self.search.cancel)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def wait(self):
+        """Block until the current search has finished and reported (or been held back)."""
+        if self.reported:
+            self.reported.wait()
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+
+    def _finished(self, handle):
+        with self._lock:
+            if self.hold:
+                self.held = handle
+                return
+        self._send_bestmove(handle)
+
+    def _send_bestmove(self, handle):
+        move = handle.result
+        if move is None and handle.board.legal_moves:
+            # The search failed; the protocol still wants a legal move, so take the best-ordered one
+            move = self.engine.order_moves(handle.board, list(handle.board.legal_moves))[0]
+        if move is None:
+            self.send("bestmove 0000")
+            return
+        last = handle.stats.last
+        if last and len(last.pv) > 1 and last.pv[0] == move:
+            self.send(f"bestmove {move.uci()} ponder {last.pv[1].uci()}")
+        else:
+            self.send(f"bestmove {move.uci()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UCI front-end for the engines.")
+    parser.add_argument("--engine", choices=sorted(uci_engines), default="engine_third")
+    args = parser.parse_args()
+
+    # Keep stdout for the protocol; the engines' progress prints go to stderr
+    protocol_output = sys.stdout
+    sys.stdout = sys.stderr
+    uci = UciEngine(args.engine, protocol_output)
+    for line in sys.stdin:
+        if not uci.handle(line.strip()):
+            break
+
+
+if __name__ == "__main__":
+    main()
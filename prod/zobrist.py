@@ -0,0 +1,161 @@
+import random
+
+import chess
+
+# Fixed seed so keys (and therefore hashes) are identical across runs and processes
+_rng = random.Random(0x5EED2024)
+
+# One key per (piece, square), indexed piece_index * 64 + square
+piece_square_keys = [_rng.getrandbits(64) for _ in range(12 * 64)]
+# One key per combination of the four castling rights
+castling_keys = [_rng.getrandbits(64) for _ in range(16)]
+# One key per en-passant file
+en_passant_keys = [_rng.getrandbits(64) for _ in range(8)]
+side_key = _rng.getrandbits(64)
+
+
+def piece_index(piece_type, color):
+    """0-5 for white pawn..king, 6-11 for black pawn..king."""
+    return piece_type - 1 if color == chess.WHITE else piece_type + 5
+
+
+def castling_index(castling_rights):
+    return (bool(castling_rights & chess.BB_H1)
+            | bool(castling_rights & chess.BB_A1) << 1
+            | bool(castling_rights & chess.BB_H8) << 2
+            | bool(castling_rights & chess.BB_A8) << 3)
+
+
+def zobrist_hash(board):
+    """Compute the Zobrist key of a position from scratch."""
+    key = 0
+    for square, piece in board.piece_map().items():
+        key ^= piece_square_keys[piece_index(piece.piece_type, piece.color) * 64 + square]
+    key ^= castling_keys[castling_index(board.clean_castling_rights())]
+    if board.ep_square is not None:
+        key ^= en_passant_keys[chess.square_file(board.ep_square)]
+    if board.turn == chess.BLACK:
+        key ^= side_key
+    return key
+
+
+def pawn_zobrist_hash(board):
+    """Zobrist key of the pawns alone, for caching pawn-structure terms."""
+    key = 0
+    for square in chess.scan_forward(board.pawns):
+        key ^= piece_square_keys[piece_index(chess.PAWN, board.color_at(square)) * 64 + square]
+    return key
+
+
+class ZobristBoard(chess.Board):
+    """chess.Board that keeps a 64-bit Zobrist key, and a pawn-only key, up to date on push/pop.
+
+    push/pop update the keys incrementally. Setting the position directly
+    (set_fen, reset, clear, set_piece_at, ...) goes through python-chess's
+    clear_stack(), which recomputes them, as do root() and apply_mirror().
+    """
+
+    def __init__(self, fen=chess.STARTING_FEN, *, chess960=False):
+        self._state_stack = []
+        super().__init__(fen, chess960=chess960)
+
+    @classmethod
+    def from_board(cls, board, **kwargs):
+        """Convert a chess.Board, replaying its move stack so repetitions still work."""
+        search_board = cls(board.root().fen(), chess960=board.chess960, **kwargs)
+        for move in board.move_stack:
+            search_board.push(move)
+        return search_board
+
+    def copy(self, *, stack=True):
+        board = super().copy(stack=stack)
+        board.zobrist_key = self.zobrist_key
+        board.pawn_key = self.pawn_key
+        board._state_stack = self._state_stack[-len(board.move_stack):] if board.move_stack else []
+        return board
+
+    def clear_stack(self):
+        super().clear_stack()
+        self._recompute_state()
+
+    def root(self):
+        # python-chess restores the root position after construction, behind clear_stack's back
+        board = super().root()
+        board._recompute_state()
+        return board
+
+    def apply_mirror(self):
+        super().apply_mirror()  # Flips the side to move after clearing the stack
+        self._recompute_state()
+
+    def _recompute_state(self):
+        """Compute the keys from scratch, for a position set other than by push/pop."""
+        self._state_stack = []
+        self.zobrist_key = zobrist_hash(self)
+        self.pawn_key = pawn_zobrist_hash(self)
+
+    def piece_index_at(self, square):
+        piece_type = self.piece_type_at(square)
+        if not piece_type:
+            return -1
+        return piece_type - 1 if self.occupied_co[chess.WHITE] & chess.BB_SQUARES[square] else piece_type + 5
+
+    def _touched_squares(self, move):
+        """Squares whose contents may change when *move* is pushed."""
+        from_square, to_square = move.from_square, move.to_square
+        squares = [from_square, to_square]
+        from_bb = chess.BB_SQUARES[from_square]
+        if to_square == self.ep_square and self.pawns & from_bb:
+            squares.append(to_square - 8 if self.turn == chess.WHITE else to_square + 8)
+        elif self.kings & from_bb and (abs(chess.square_file(from_square) - chess.square_file(to_square)) > 1
+                                       or self.occupied_co[self.turn] & chess.BB_SQUARES[to_square]):
+            first = chess.square_rank(from_square) * 8
+            squares.extend(sq for sq in (first, first + 2, first + 3, first + 5, first + 6, first + 7)
+                           if sq not in squares)
+        return squares
+
+    def _save_state(self):
+        return self.zobrist_key, self.pawn_key
+
+    def _restore_state(self, state):
+        self.zobrist_key, self.pawn_key = state
+
+    def _update_square(self, square, old_index, new_index):
+        # Pawns are piece indices 0 (white) and 6 (black)
+        if old_index >= 0:
+            self.zobrist_key ^= piece_square_keys[old_index * 64 + square]
+            if old_index % 6 == 0:
+                self.pawn_key ^= piece_square_keys[old_index * 64 + square]
+        if new_index >= 0:
+            self.zobrist_key ^= piece_square_keys[new_index * 64 + square]
+            if new_index % 6 == 0:
+                self.pawn_key ^= piece_square_keys[new_index * 64 + square]
+
+    def push(self, move):
+        squares = self._touched_squares(move)
+        before = [self.piece_index_at(sq) for sq in squares]
+        old_castling = castling_index(self.clean_castling_rights())
+        old_ep_square = self.ep_square
+        self._state_stack.append(self._save_state())
+
+        super().push(move)
+
+        for square, old_index in zip(squares, before):
+            new_index = self.piece_index_at(square)
+            if new_index != old_index:
+                self._update_square(square, old_index, new_index)
+
+        key = self.zobrist_key ^ side_key
+        new_castling = castling_index(self.clean_castling_rights())
+        if new_castling != old_castling:
+            key ^= castling_keys[old_castling] ^ castling_keys[new_castling]
+        if old_ep_square is not None:
+            key ^= en_passant_keys[chess.square_file(old_ep_square)]
+        if self.ep_square is not None:
+            key ^= en_passant_keys[chess.square_file(self.ep_square)]
+        self.zobrist_key = key
+
+    def pop(self):
+        move = super().pop()
+        self._restore_state(self._state_stack.pop())
+        return move